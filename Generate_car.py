@@ -443,9 +443,8 @@ def get_depreciation(age: int, brand_mult: float, fuel_type: str):
 
 
 # ---------- Generator ----------
-rows = []
-N = 700
-for _ in range(N):
+def generate_listing():
+    """One random listing following the brand, depreciation and pricing rules above"""
     model = random.choice(list(model_specs.keys()))
     spec = model_specs[model]
     make = spec["make"]
@@ -536,7 +535,7 @@ for _ in range(N):
     # market noise
     price *= random.uniform(0.88, 1.12)
 
-    rows.append({
+    return {
         "make": make,
         "model": model,
         "trim": trim["trim"],
@@ -553,9 +552,16 @@ for _ in range(N):
         "condition": condition,
         "retail_price(RM)": base_price,
         "current_price(RM)": round(max(5000, price), 2)
-    })
+    }
 
-df = pd.DataFrame(rows)
-df.to_csv("malaysia_used_cars.csv", index=False)
-print("Saved malaysia_used_cars.csv with", len(df), "rows")
-print(df.sample(6))
+
+def generate_rows(n):
+    return [generate_listing() for _ in range(n)]
+
+
+if __name__ == "__main__":
+    N = 700
+    df = pd.DataFrame(generate_rows(N))
+    df.to_csv("malaysia_used_cars.csv", index=False)
+    print("Saved malaysia_used_cars.csv with", len(df), "rows")
+    print(df.sample(6))
@@ -0,0 +1,133 @@
+# anytime.py
+import os
+import time
+import pickle
+from collections import namedtuple
+
+import numpy as np
+
+from timing import best_time
+
+PARENT_PATH = os.getcwd()
+USED_CAR = os.path.join(PARENT_PATH, 'malaysia_used_cars.csv')
+
+MODELS = os.path.join(PARENT_PATH, 'models')
+RF_MODEL = os.path.join(MODELS, 'RF_regression.pkl')
+
+# Trees averaged before the standard error is trusted
+MIN_TREES = 10
+
+AnytimeResult = namedtuple('AnytimeResult', ['prediction', 'n_trees', 'std_error'])
+
+
+# ============================================================================
+# EARLY-EXIT PREDICTION
+# ============================================================================
+def predict_anytime(model, X, tol_rm=None, tol_pct=None, budget_ms=None, min_trees=MIN_TREES):
+    """
+    Average the forest's trees one at a time, in the fitted order, and stop
+    per row once the standard error of the running mean (Welford mean and
+    variance over the tree outputs) is within tolerance:
+
+        se <= max(tol_rm, tol_pct / 100 * |mean|)
+
+    Rows that converge drop out; the rest keep going until every tree is
+    used or budget_ms runs out. With no tolerance and no budget this is
+    the full forest average. Trees in a bagged forest are correlated, so
+    the standard error is a stopping heuristic, not a confidence bound.
+
+    Returns AnytimeResult(prediction, n_trees, std_error), one entry per row.
+    """
+    X = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+    trees = model.estimators_
+    n = len(X)
+    min_trees = max(2, min(min_trees, len(trees)))
+    deadline = None if budget_ms is None else time.perf_counter() + budget_ms / 1000
+
+    mean = np.zeros(n)
+    m2 = np.zeros(n)
+    count = np.zeros(n, dtype=np.int64)
+    active = np.arange(n)
+
+    for i, tree in enumerate(trees, start=1):
+        values = tree.tree_.predict(X[active])[:, 0]
+        delta = values - mean[active]
+        mean[active] += delta / i
+        m2[active] += delta * (values - mean[active])
+        count[active] = i
+
+        if i >= min_trees and (tol_rm is not None or tol_pct is not None):
+            se = np.sqrt(m2[active] / (i - 1) / i)
+            tolerance = np.zeros(len(active))
+            if tol_rm is not None:
+                tolerance = np.maximum(tolerance, tol_rm)
+            if tol_pct is not None:
+                tolerance = np.maximum(tolerance, tol_pct / 100 * np.abs(mean[active]))
+            active = active[se > tolerance]
+
+        if not len(active) or (deadline is not None and time.perf_counter() >= deadline):
+            break
+
+    std_error = np.sqrt(m2 / np.maximum(count - 1, 1) / np.maximum(count, 1))
+    return AnytimeResult(mean, count, std_error)
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+def benchmark(model, X, settings):
+    """Trees used, time and deviation from the full forest for each setting"""
+    reference = model.predict(X)
+    single = X.iloc[:1]
+    rows = [{
+        'setting': 'full forest',
+        'mean_trees': float(len(model.estimators_)),
+        'batch_ms': best_time(lambda: model.predict(X)) * 1000,
+        'single_ms': best_time(lambda: model.predict(single)) * 1000,
+        'mean_abs_dev_rm': 0.0,
+        'p99_abs_dev_rm': 0.0,
+        'mean_abs_dev_pct': 0.0
+    }]
+
+    for label, kwargs in settings:
+        result = predict_anytime(model, X, **kwargs)
+        deviation = np.abs(result.prediction - reference)
+        rows.append({
+            'setting': label,
+            'mean_trees': result.n_trees.mean(),
+            'batch_ms': best_time(lambda: predict_anytime(model, X, **kwargs)) * 1000,
+            'single_ms': best_time(lambda: predict_anytime(model, single, **kwargs)) * 1000,
+            'mean_abs_dev_rm': deviation.mean(),
+            'p99_abs_dev_rm': np.percentile(deviation, 99),
+            'mean_abs_dev_pct': 100 * (deviation / np.abs(reference).clip(min=1)).mean()
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+    import pandas as pd
+    from dataset import load_used_cars
+    from pricing import encode_listings, model_features
+
+    parser = argparse.ArgumentParser(description="Benchmark early-exit forest prediction")
+    parser.add_argument('--model', default=RF_MODEL)
+    parser.add_argument('--rows', type=int, default=None, help="Benchmark on a sample of rows")
+    parser.add_argument('--min-trees', type=int, default=MIN_TREES)
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as file:
+        model = pickle.load(file)
+    X = encode_listings(load_used_cars(USED_CAR))[model_features(model)]
+    if args.rows:
+        X = X.sample(min(args.rows, len(X)), random_state=42)
+
+    settings = [(f'tol RM {tol:,}', {'tol_rm': tol, 'min_trees': args.min_trees})
+                for tol in (250, 500, 1000, 2000)]
+    settings += [(f'tol {tol}%', {'tol_pct': tol, 'min_trees': args.min_trees})
+                 for tol in (0.5, 1, 2)]
+    settings.append(('budget 5 ms', {'budget_ms': 5, 'min_trees': args.min_trees}))
+
+    report = pd.DataFrame(benchmark(model, X, settings)).set_index('setting')
+    print(f"{len(X):,} rows, {len(model.estimators_)} trees")
+    print(report.round(2).to_string())
@@ -0,0 +1,118 @@
+# comparables.py
+import os
+import time
+import pickle
+import numpy as np
+from sklearn.neighbors import KDTree
+
+from dataset import load_used_cars
+
+PARENT_PATH = os.getcwd()
+USED_CAR = os.path.join(PARENT_PATH, 'malaysia_used_cars.csv')
+
+MODELS = os.path.join(PARENT_PATH, 'models')
+COMPARABLES_INDEX = os.path.join(MODELS, 'comparables_index.pkl')
+
+# Dataset columns the distance is measured on, and the matching car fields
+NUMERIC = ['year', 'mileage', 'retail_price(RM)']
+CAR_FIELDS = ['year', 'mileage', 'retail_price']
+
+PARTITION_KEYS = ['make', 'transmission']
+
+DISPLAY_COLUMNS = [
+    'make', 'model', 'trim', 'year', 'mileage', 'transmission',
+    'fuel_type', 'location', 'condition', 'retail_price(RM)', 'current_price(RM)'
+]
+
+
+# ============================================================================
+# NEAREST-NEIGHBOUR INDEX
+# ============================================================================
+class ComparablesIndex:
+    """
+    Finds the listings most similar to a car configuration.
+
+    Listings are partitioned by make and transmission, and each partition
+    gets a KD-tree over year, mileage and retail price scaled by their
+    standard deviations. A query searches only its own partition. If the
+    make never appears with that transmission, it falls back to a
+    make-only partition.
+    """
+
+    def __init__(self, df, leaf_size=40):
+        df = df.reset_index(drop=True)
+        self.listings = df[DISPLAY_COLUMNS].copy()
+
+        points = df[NUMERIC].to_numpy(dtype=float)
+        self.scale = points.std(axis=0)
+        self.scale[self.scale == 0] = 1.0
+        scaled = points / self.scale
+
+        self.partitions = {}
+        groups = df.groupby(PARTITION_KEYS, observed=True).indices
+        groups.update({(make, None): rows
+                       for make, rows in df.groupby('make', observed=True).indices.items()})
+        for key, rows in groups.items():
+            self.partitions[key] = (KDTree(scaled[rows], leaf_size=leaf_size), rows)
+
+    def query(self, car, k=5):
+        """
+        Top-k listings closest to a car dict (as built by the app) within
+        its make and transmission, with a 'distance' column.
+        """
+        partition = (self.partitions.get((car['make'], car['transmission']))
+                     or self.partitions.get((car['make'], None)))
+        if partition is None:
+            return self.listings.iloc[:0].assign(distance=[])
+
+        tree, rows = partition
+        point = np.array([[car[field] for field in CAR_FIELDS]], dtype=float) / self.scale
+        distance, index = tree.query(point, k=min(k, len(rows)))
+
+        result = self.listings.iloc[rows[index[0]]].copy()
+        result['distance'] = distance[0]
+        return result
+
+    def save(self, path=COMPARABLES_INDEX):
+        # Plain attributes only, so the file loads the same whichever
+        # module (or __main__) the index was built from
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(vars(self), f)
+
+    @classmethod
+    def load(cls, path=COMPARABLES_INDEX):
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        index = cls.__new__(cls)
+        index.__dict__.update(state)
+        return index
+
+
+# ============================================================================
+# BUILD OFFLINE
+# ============================================================================
+def build_and_save(data_path=USED_CAR, path=COMPARABLES_INDEX):
+    """Build the index from the listings CSV and save it"""
+    index = ComparablesIndex(load_used_cars(data_path))
+    index.save(path)
+    return index
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    index = build_and_save()
+    build_time = time.perf_counter() - start
+
+    car = {
+        'make': 'Toyota', 'transmission': 'CVT',
+        'year': 2021, 'mileage': 50000, 'retail_price': 128000.0
+    }
+    start = time.perf_counter()
+    result = index.query(car)
+    query_time = time.perf_counter() - start
+
+    print(f"Indexed {len(index.listings):,} listings in {len(index.partitions)} partitions "
+          f"in {build_time * 1000:.1f} ms; saved to {COMPARABLES_INDEX}")
+    print(f"Example query in {query_time * 1000:.2f} ms:")
+    print(result.to_string())
@@ -0,0 +1,128 @@
+# dataset.py
+import os
+import time
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+PARENT_PATH = os.getcwd()
+USED_CAR = os.path.join(PARENT_PATH, 'malaysia_used_cars.csv')
+
+# ============================================================================
+# SCHEMA
+# ============================================================================
+# Columns as written by Generate_car.py. Repeated strings become categoricals,
+# numbers are sized to their ranges, and is_turbo is a nullable boolean so
+# EVs (no turbo) stay <NA> instead of turning the column into objects.
+# Prices stay float64: float32 cannot hold RM amounts to the cent.
+DTYPES = {
+    'make': 'category',
+    'model': 'category',
+    'trim': 'category',
+    'car_type': 'category',
+    'year': 'int16',
+    'mileage': 'int32',
+    'transmission': 'category',
+    'fuel_type': 'category',
+    'engine_cc': 'float32',
+    'battery_kWh': 'float32',
+    'is_turbo': 'boolean',
+    'origin_country': 'category',
+    'location': 'category',
+    'condition': 'int8',
+    'retail_price(RM)': 'float64',
+    'current_price(RM)': 'float64'
+}
+
+
+def _cache_path(path):
+    suffix = '.parquet' if HAS_PYARROW else '.pkl'
+    return os.path.splitext(path)[0] + suffix
+
+
+def _read_cache(cache_path):
+    if cache_path.endswith('.parquet'):
+        return pd.read_parquet(cache_path)
+    return pd.read_pickle(cache_path)
+
+
+def _matches_schema(df):
+    """False for caches written under an older DTYPES"""
+    return all(column in df and str(df[column].dtype) == dtype for column, dtype in DTYPES.items())
+
+
+def _write_cache(df, cache_path):
+    tmp_path = cache_path + '.tmp'
+    if cache_path.endswith('.parquet'):
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, cache_path)
+
+
+# ============================================================================
+# LOADER
+# ============================================================================
+def load_used_cars(path=USED_CAR, cache=False, engine=None):
+    """
+    Load malaysia_used_cars.csv with the declared schema.
+
+    Uses the pyarrow CSV engine when it is installed. With cache=True a
+    binary copy (parquet, or pickle without pyarrow) is kept next to the
+    CSV and reused until the CSV is modified or DTYPES changes.
+    """
+    cache_path = _cache_path(path)
+    if cache and os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        df = _read_cache(cache_path)
+        if _matches_schema(df):
+            return df
+
+    if engine is None:
+        engine = 'pyarrow' if HAS_PYARROW else 'c'
+    df = pd.read_csv(path, engine=engine, dtype=DTYPES)
+
+    if cache:
+        _write_cache(df, cache_path)
+    return df
+
+
+def memory_report(df):
+    """Deep memory usage per column in bytes, plus a 'TOTAL' row"""
+    usage = df.memory_usage(deep=True, index=False)
+    usage['TOTAL'] = usage.sum()
+    return usage
+
+
+# ============================================================================
+# COMPARE WITH A PLAIN read_csv
+# ============================================================================
+if __name__ == "__main__":
+    start = time.perf_counter()
+    plain = pd.read_csv(USED_CAR)
+    plain_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    typed = load_used_cars(USED_CAR)
+    typed_time = time.perf_counter() - start
+
+    load_used_cars(USED_CAR, cache=True)
+    start = time.perf_counter()
+    load_used_cars(USED_CAR, cache=True)
+    cached_time = time.perf_counter() - start
+
+    plain_mem = memory_report(plain)
+    typed_mem = memory_report(typed)
+    report = pd.DataFrame({
+        'plain (bytes)': plain_mem,
+        'typed (bytes)': typed_mem,
+        'typed dtype': typed.dtypes.astype(str).reindex(typed_mem.index).fillna('')
+    })
+    print(report.to_string())
+    print(f"\nMemory: {plain_mem['TOTAL'] / 1e6:.2f} MB -> {typed_mem['TOTAL'] / 1e6:.2f} MB "
+          f"({typed_mem['TOTAL'] / plain_mem['TOTAL']:.0%})")
+    print(f"Load time: plain {plain_time * 1000:.1f} ms, typed {typed_time * 1000:.1f} ms, "
+          f"cached {cached_time * 1000:.1f} ms")
@@ -0,0 +1,128 @@
+# dedup.py
+import os
+import time
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+PARENT_PATH = os.getcwd()
+USED_CAR = os.path.join(PARENT_PATH, 'malaysia_used_cars.csv')
+
+# Listings can only be duplicates of each other within the same block
+BLOCK_KEYS = ['make', 'model', 'trim', 'year', 'location']
+
+# Attributes a relisted car would not change
+MATCH_KEYS = ['transmission', 'fuel_type']
+
+MILEAGE_TOLERANCE_KM = 2000
+MILEAGE_TOLERANCE_PCT = 2.0
+PRICE_TOLERANCE_PCT = 3.0
+
+PRICE = 'current_price(RM)'
+
+
+# ============================================================================
+# NEAR-DUPLICATE DETECTION
+# ============================================================================
+def find_duplicates(df, window=None, mileage_km=MILEAGE_TOLERANCE_KM,
+                    mileage_pct=MILEAGE_TOLERANCE_PCT, price_pct=PRICE_TOLERANCE_PCT):
+    """
+    Cluster listings that look like the same car listed more than once.
+
+    Rows are bucketed by a hash of BLOCK_KEYS and sorted by mileage inside
+    each bucket. Each row is compared with the following rows of its
+    bucket until their mileage gap exceeds the tolerance, so dense blocks
+    do not hide matches. `window` optionally caps how many rows ahead are
+    checked. Two rows match when their MATCH_KEYS are equal, their mileage
+    is within max(mileage_km, mileage_pct%) and their price is within
+    price_pct%. Matches are joined into clusters with connected
+    components. The work is one sort plus one vectorized pass per offset,
+    over only the rows still in mileage range, so it grows near-linearly
+    with the number of rows unless many listings share a block and
+    mileage band.
+
+    Returns an int Series aligned with df: the cluster id for rows that
+    have at least one duplicate, -1 otherwise.
+    """
+    n_rows = len(df)
+    block = pd.util.hash_pandas_object(df[BLOCK_KEYS], index=False).to_numpy()
+    match = pd.util.hash_pandas_object(df[MATCH_KEYS], index=False).to_numpy()
+    mileage = df['mileage'].to_numpy(dtype=float)
+    price = df[PRICE].to_numpy(dtype=float)
+
+    order = np.lexsort((mileage, block))
+    block, match = block[order], match[order]
+    mileage, price = mileage[order], price[order]
+
+    # Mileage is sorted within a block, so once a row's next neighbour at
+    # some offset is out of range, every larger offset is too
+    tolerance = np.maximum(mileage_km, mileage * mileage_pct / 100)
+    # Seeded so empty frames and window=0 still concatenate
+    sources, targets = [np.empty(0, dtype=np.intp)], [np.empty(0, dtype=np.intp)]
+    a = np.arange(n_rows)
+    offset = 1
+    while len(a) and (window is None or offset <= window):
+        a = a[a + offset < n_rows]
+        b = a + offset
+        in_range = (block[a] == block[b]) & (mileage[b] - mileage[a] <= tolerance[a])
+        a, b = a[in_range], b[in_range]
+        price_ok = np.abs(price[b] - price[a]) <= np.maximum(price[a], price[b]) * price_pct / 100
+        hit = (match[a] == match[b]) & price_ok
+        sources.append(order[a[hit]])
+        targets.append(order[b[hit]])
+        offset += 1
+
+    sources = np.concatenate(sources)
+    targets = np.concatenate(targets)
+    graph = coo_matrix((np.ones(len(sources)), (sources, targets)), shape=(n_rows, n_rows))
+    _, labels = connected_components(graph, directed=False)
+
+    # Singletons get -1; real clusters are renumbered from 0
+    sizes = np.bincount(labels)
+    duplicated = sizes[labels] > 1
+    clusters = np.full(n_rows, -1)
+    _, clusters[duplicated] = np.unique(labels[duplicated], return_inverse=True)
+    return pd.Series(clusters, index=df.index, name='duplicate_cluster')
+
+
+def duplicate_report(df, clusters):
+    """One row per cluster with its size and the spread of mileage and price"""
+    grouped = df[clusters >= 0].groupby(clusters[clusters >= 0])
+    report = grouped.agg(
+        size=(PRICE, 'size'),
+        make=('make', 'first'),
+        model=('model', 'first'),
+        year=('year', 'first'),
+        mileage_min=('mileage', 'min'),
+        mileage_max=('mileage', 'max'),
+        price_min=(PRICE, 'min'),
+        price_max=(PRICE, 'max')
+    )
+    return report.sort_values('size', ascending=False)
+
+
+def drop_duplicates(df, clusters):
+    """Keep the first listing of every duplicate cluster"""
+    keep = (clusters < 0) | ~clusters.duplicated()
+    return df[keep]
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == "__main__":
+    from dataset import load_used_cars
+
+    df = load_used_cars(USED_CAR)
+
+    start = time.perf_counter()
+    clusters = find_duplicates(df)
+    elapsed = time.perf_counter() - start
+
+    report = duplicate_report(df, clusters)
+    n_extra = int((clusters >= 0).sum()) - len(report)
+    print(f"Checked {len(df):,} listings in {elapsed * 1000:.1f} ms")
+    print(f"Found {len(report):,} duplicate clusters ({n_extra:,} redundant listings)")
+    if len(report):
+        print(report.head(20).to_string())
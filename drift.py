@@ -0,0 +1,221 @@
+# drift.py
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+import numpy as np
+
+import metrics
+from dataset import load_used_cars
+from pricing import FEATURES, BRAND_CODES, TRANSMISSION_CODES, TURBO_CODES, encode_listings
+
+PARENT_PATH = os.getcwd()
+USED_CAR = os.path.join(PARENT_PATH, 'malaysia_used_cars.csv')
+
+MODELS = os.path.join(PARENT_PATH, 'models')
+RF_MODEL = os.path.join(MODELS, 'RF_regression.pkl')
+
+
+def reference_path(model_path):
+    """Drift reference kept beside an unversioned model file"""
+    return os.path.splitext(model_path)[0] + '_drift_reference.json'
+
+
+DRIFT_REFERENCE = reference_path(RF_MODEL)
+
+logger = logging.getLogger(__name__)
+
+CATEGORICAL = {
+    'is_turbo': sorted(TURBO_CODES.values()),
+    'make': sorted(BRAND_CODES.values()),
+    'transmission': sorted(TRANSMISSION_CODES.values())
+}
+
+# Population stability index bands
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Keeps empty bins from producing infinite PSI
+EPSILON = 1e-4
+
+
+# ============================================================================
+# BINNING
+# ============================================================================
+def _numeric_bins(values, n_bins=10):
+    """Quantile bin edges from the training values of one feature"""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+    return {
+        'kind': 'numeric',
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'edges': edges.tolist()
+    }
+
+
+def _categorical_bins(categories):
+    return {'kind': 'categorical', 'categories': sorted(categories)}
+
+
+def bin_index(spec, values):
+    """
+    Map raw values to bin numbers for one feature.
+
+    Numeric features get one bin below the training minimum, the quantile
+    bins, and one bin above the training maximum. Categorical features get
+    one bin per known code plus a final bin for unknown codes.
+    """
+    values = np.asarray(values, dtype=float)
+    if spec['kind'] == 'numeric':
+        edges = np.asarray(spec['edges'])
+        index = np.searchsorted(edges, values, side='right') + 1
+        index[values < spec['min']] = 0
+        index[(values > spec['max']) | np.isnan(values)] = len(edges) + 2
+        return index
+    categories = np.asarray(spec['categories'], dtype=float)
+    position = np.searchsorted(categories, values).clip(max=len(categories) - 1)
+    known = categories[position] == values
+    return np.where(known, position, len(categories))
+
+
+def n_bins(spec):
+    if spec['kind'] == 'numeric':
+        return len(spec['edges']) + 3
+    return len(spec['categories']) + 1
+
+
+def psi(expected, actual):
+    """Population stability index between two bin-proportion vectors"""
+    expected = np.clip(np.asarray(expected, dtype=float), EPSILON, None)
+    actual = np.clip(np.asarray(actual, dtype=float), EPSILON, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+# ============================================================================
+# TRAINING REFERENCE
+# ============================================================================
+def build_reference(X):
+    """Bin specs and training proportions for every model feature"""
+    reference = {'n_rows': int(len(X)), 'features': {}}
+    for feature in FEATURES:
+        if feature in CATEGORICAL:
+            spec = _categorical_bins(CATEGORICAL[feature])
+        else:
+            spec = _numeric_bins(X[feature])
+        counts = np.bincount(bin_index(spec, X[feature]), minlength=n_bins(spec))
+        spec['proportions'] = (counts / counts.sum()).tolist()
+        reference['features'][feature] = spec
+    return reference
+
+
+def save_reference(reference, path=DRIFT_REFERENCE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(reference, f, indent=2)
+
+
+def load_reference(path=DRIFT_REFERENCE):
+    with open(path) as f:
+        return json.load(f)
+
+
+# ============================================================================
+# STREAMING MONITOR
+# ============================================================================
+class DriftMonitor:
+    """
+    Streaming input drift monitor.
+
+    Each incoming batch is binned against the training reference and added
+    to fixed-size count arrays for the current time window; raw requests
+    are never stored. When a window closes, PSI per feature is computed
+    against the training proportions, logged, exported as metrics and kept
+    in a bounded history.
+    """
+
+    def __init__(self, reference, window_seconds=3600, history=24, min_count=30):
+        self.reference = reference
+        self.specs = reference['features']
+        self.window_seconds = window_seconds
+        self.min_count = min_count
+        self.history = deque(maxlen=history)
+        self.lock = threading.Lock()
+        self._reset(time.time())
+
+    def _reset(self, now):
+        self.window_start = now
+        self.count = 0
+        self.counts = {feature: np.zeros(n_bins(spec), dtype=np.int64)
+                       for feature, spec in self.specs.items()}
+
+    def observe(self, input_data, now=None):
+        """Add a batch of model inputs (a FEATURES-shaped frame) to the window"""
+        now = time.time() if now is None else now
+        binned = {feature: bin_index(spec, input_data[feature])
+                  for feature, spec in self.specs.items()}
+
+        with self.lock:
+            if now - self.window_start >= self.window_seconds:
+                self._close_window(now)
+            for feature, index in binned.items():
+                counts = self.counts[feature]
+                counts += np.bincount(index, minlength=counts.size)
+            self.count += len(input_data)
+
+    def scores(self):
+        """PSI and out-of-range share per feature for the current window"""
+        with self.lock:
+            return self._scores()
+
+    def _scores(self):
+        result = {}
+        for feature, counts in self.counts.items():
+            spec = self.specs[feature]
+            total = counts.sum()
+            if total == 0:
+                continue
+            actual = counts / total
+            if spec['kind'] == 'numeric':
+                out_of_range = actual[0] + actual[-1]
+            else:
+                out_of_range = actual[-1]
+            result[feature] = {
+                'psi': psi(spec['proportions'], actual),
+                'out_of_range': float(out_of_range)
+            }
+        return result
+
+    def _close_window(self, now):
+        report = {
+            'window_start': self.window_start,
+            'window_end': now,
+            'count': self.count,
+            'features': self._scores()
+        }
+        self.history.append(report)
+
+        if self.count >= self.min_count:
+            for feature, score in report['features'].items():
+                metrics.set_gauge('input_drift_psi', score['psi'], feature=feature)
+                metrics.set_gauge('input_out_of_range_ratio', score['out_of_range'], feature=feature)
+                if score['psi'] >= PSI_SIGNIFICANT:
+                    logger.warning("Input drift on %s: PSI %.3f over %d requests",
+                                   feature, score['psi'], self.count)
+
+        self._reset(now)
+        return report
+
+
+# ============================================================================
+# BUILD REFERENCE FROM THE DATASET
+# ============================================================================
+if __name__ == "__main__":
+    X = encode_listings(load_used_cars(USED_CAR))
+    reference = build_reference(X)
+    save_reference(reference)
+    print(f"Saved drift reference for {reference['n_rows']} rows to {DRIFT_REFERENCE}")
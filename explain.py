@@ -0,0 +1,133 @@
+# explain.py
+import os
+import time
+import pickle
+import numpy as np
+import pandas as pd
+
+from forest import flatten_forest, global_children, walk
+
+PARENT_PATH = os.getcwd()
+USED_CAR = os.path.join(PARENT_PATH, 'malaysia_used_cars.csv')
+
+MODELS = os.path.join(PARENT_PATH, 'models')
+RF_MODEL = os.path.join(MODELS, 'RF_regression.pkl')
+
+# Largest |bias + contributions - predict| accepted by the offline check
+FLOAT_TOLERANCE = 1e-6
+
+
+# ============================================================================
+# DECISION-PATH CONTRIBUTIONS
+# ============================================================================
+class ForestExplainer:
+    """
+    Per-feature contribution breakdowns for a fitted RandomForestRegressor.
+
+    Every split on a car's path moves the prediction from the parent node's
+    mean to the child's mean; that change is credited to the split feature.
+    Averaged over trees, prediction = bias + sum(contributions).
+
+    All trees are flattened into one set of node arrays when the explainer
+    is built, so a batch is explained by walking every (car, tree) pair one
+    level at a time with numpy instead of visiting nodes in Python.
+    """
+
+    def __init__(self, model, feature_names=None):
+        arrays = flatten_forest(model)
+        self.roots = arrays['roots']
+        self.left = global_children(arrays['left'], self.roots)
+        self.right = global_children(arrays['right'], self.roots)
+        self.is_leaf = arrays['is_leaf']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        self.n_trees = len(self.roots)
+        self.n_features = model.n_features_in_
+        if feature_names is None:
+            feature_names = getattr(model, 'feature_names_in_', range(self.n_features))
+        self.feature_names = [str(name) for name in feature_names]
+
+        # Mean of the root values is the forest's expected prediction
+        self.bias = float(self.value[self.roots].mean())
+
+    def explain(self, X, chunk_size=2000):
+        """
+        Return (predictions, contributions) for X.
+
+        contributions has shape (n_samples, n_features); each row sums to
+        its prediction minus self.bias. Rows are processed in chunks so
+        large batches stay within a bounded amount of memory.
+        """
+        # Trees compare float32 features against their thresholds
+        X = np.asarray(X, dtype=np.float32)
+        n_samples = X.shape[0]
+        contributions = np.empty((n_samples, self.n_features))
+
+        for start in range(0, n_samples, chunk_size):
+            stop = min(start + chunk_size, n_samples)
+            contributions[start:stop] = self._explain_chunk(X[start:stop])
+
+        predictions = self.bias + contributions.sum(axis=1)
+        return predictions, contributions
+
+    def _explain_chunk(self, X):
+        n_samples = X.shape[0]
+
+        totals = np.zeros(n_samples * self.n_features)
+
+        def next_node(rows, trees, nodes):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            return np.where(go_left, self.left[nodes], self.right[nodes])
+
+        # Root-only trees have no splits and contribute nothing beyond the bias
+        for rows, nodes, children in walk(n_samples, self.roots, self.is_leaf, next_node):
+            totals += np.bincount(
+                rows * self.n_features + self.feature[nodes],
+                weights=self.value[children] - self.value[nodes],
+                minlength=totals.size
+            )
+
+        return totals.reshape(n_samples, self.n_features) / self.n_trees
+
+    def explain_frame(self, X):
+        """Contributions for X as a DataFrame with one column per feature"""
+        _, contributions = self.explain(X)
+        index = X.index if isinstance(X, pd.DataFrame) else None
+        return pd.DataFrame(contributions, columns=self.feature_names, index=index)
+
+
+# ============================================================================
+# OFFLINE BATCH EXPLANATION
+# ============================================================================
+if __name__ == "__main__":
+    from dataset import load_used_cars
+    from pricing import encode_listings, model_features
+
+    with open(RF_MODEL, 'rb') as file:
+        model = pickle.load(file)
+
+    X = encode_listings(load_used_cars(USED_CAR))[model_features(model)]
+
+    start = time.perf_counter()
+    explainer = ForestExplainer(model)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictions, contributions = explainer.explain(X)
+    explain_time = time.perf_counter() - start
+
+    max_error = np.abs(predictions - model.predict(X)).max()
+
+    print(f"Explainer built in {build_time * 1000:.1f} ms "
+          f"({explainer.n_trees} trees, {explainer.value.size:,} nodes)")
+    print(f"Explained {len(X):,} cars in {explain_time * 1000:.1f} ms")
+    print(f"Max |bias + contributions - predict|: {max_error:.6f}")
+    print(f"\nBias (expected price): RM {explainer.bias:,.2f}")
+    print("\nMean |contribution| per feature (RM):")
+    mean_abs = pd.Series(np.abs(contributions).mean(axis=0), index=explainer.feature_names)
+    print(mean_abs.sort_values(ascending=False).round(2).to_string())
+
+    if max_error > FLOAT_TOLERANCE:
+        raise SystemExit(f"Contributions do not add up to model.predict "
+                         f"(max error {max_error:.6f} > {FLOAT_TOLERANCE})")
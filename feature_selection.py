@@ -0,0 +1,190 @@
+# feature_selection.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import mean_absolute_error, r2_score
+
+PARENT_PATH = os.getcwd()
+USED_CAR = os.path.join(PARENT_PATH, 'malaysia_used_cars.csv')
+
+# A feature is kept when shuffling it raises validation MAE by more than
+# this share of the baseline MAE, after subtracting two standard deviations
+MIN_IMPORTANCE_PCT = 1.0
+
+N_REPEATS = 5
+
+# Set in each worker process by the pool initializers
+_worker = {}
+
+
+# ============================================================================
+# WORKER TASKS
+# ============================================================================
+def _init_permutation_worker(model, X, y):
+    """Receive the fitted model and validation split once per process"""
+    _worker.update(model=model, X=X, y=y)
+
+
+def _permutation_task(task):
+    """Validation MAE and R² with one feature shuffled, for one repeat"""
+    feature, repeat, seed = task
+    X = _worker['X'].copy()
+    rng = np.random.default_rng(seed)
+    X[feature] = rng.permutation(X[feature].to_numpy())
+    prediction = _worker['model'].predict(X)
+    return feature, repeat, mean_absolute_error(_worker['y'], prediction), r2_score(_worker['y'], prediction)
+
+
+def _init_drop_worker(estimator, X_train, y_train, X_val, y_val):
+    _worker.update(estimator=estimator, X_train=X_train, y_train=y_train, X_val=X_val, y_val=y_val)
+
+
+def _drop_column_task(feature):
+    """Validation MAE of a model refitted without one feature"""
+    model = clone(_worker['estimator'])
+    model.fit(_worker['X_train'].drop(columns=feature), _worker['y_train'])
+    prediction = model.predict(_worker['X_val'].drop(columns=feature))
+    return feature, mean_absolute_error(_worker['y_val'], prediction)
+
+
+def _run_tasks(task, tasks, initializer, initargs, n_jobs):
+    """Map task over tasks in a process pool, or in-process for n_jobs=1"""
+    if n_jobs == 1:
+        initializer(*initargs)
+        try:
+            return [task(item) for item in tasks]
+        finally:
+            _worker.clear()
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=initializer, initargs=initargs) as pool:
+        chunksize = max(1, len(tasks) // (4 * (n_jobs or os.cpu_count() or 1)))
+        return list(pool.map(task, tasks, chunksize=chunksize))
+
+
+# ============================================================================
+# IMPORTANCE
+# ============================================================================
+def permutation_importance(model, X, y, n_repeats=N_REPEATS, n_jobs=None, random_state=42):
+    """
+    Rank features by how much shuffling each one hurts a fitted model on
+    held-out data. Every (feature, repeat) pair is a separate task; the
+    model and data reach each worker process once through the pool
+    initializer instead of being pickled with every task.
+
+    Returns (baseline_mae, report) where report is indexed by feature and
+    sorted by mae_increase (RM, mean over repeats), with mae_increase_std
+    and r2_drop columns.
+    """
+    baseline = model.predict(X)
+    baseline_mae = mean_absolute_error(y, baseline)
+    baseline_r2 = r2_score(y, baseline)
+
+    # Seeds depend only on (feature, repeat), so results do not depend on scheduling
+    tasks = [(feature, repeat, [random_state, i, repeat])
+             for i, feature in enumerate(X.columns) for repeat in range(n_repeats)]
+    results = _run_tasks(_permutation_task, tasks, _init_permutation_worker, (model, X, y), n_jobs)
+
+    scores = pd.DataFrame(results, columns=['feature', 'repeat', 'mae', 'r2'])
+    scores['mae_increase'] = scores['mae'] - baseline_mae
+    scores['r2_drop'] = baseline_r2 - scores['r2']
+    report = scores.groupby('feature').agg(
+        mae_increase=('mae_increase', 'mean'),
+        mae_increase_std=('mae_increase', 'std'),
+        r2_drop=('r2_drop', 'mean')
+    ).fillna({'mae_increase_std': 0.0})
+    return baseline_mae, report.sort_values('mae_increase', ascending=False)
+
+
+def drop_column_importance(estimator, X_train, y_train, X_val, y_val, baseline_mae, n_jobs=None):
+    """
+    Increase in validation MAE (RM) when the model is refitted without
+    each feature, one refit per feature in parallel. Slower than
+    permutation importance, but it is not fooled by correlated features
+    standing in for each other at predict time.
+    """
+    initargs = (clone(estimator), X_train, y_train, X_val, y_val)
+    results = _run_tasks(_drop_column_task, list(X_train.columns), _init_drop_worker, initargs, n_jobs)
+    return pd.Series({feature: mae - baseline_mae for feature, mae in results},
+                     name='drop_column_mae_increase')
+
+
+def prune_features(report, baseline_mae, columns, min_pct=MIN_IMPORTANCE_PCT):
+    """
+    Features whose permutation importance clearly exceeds min_pct% of
+    the baseline MAE, in their original column order. The most important
+    feature is always kept.
+    """
+    threshold = min_pct / 100 * baseline_mae
+    lower_bound = report['mae_increase'] - 2 * report['mae_increase_std']
+    kept = set(report.index[lower_bound > threshold]) or {report.index[0]}
+    return [column for column in columns if column in kept]
+
+
+def select_by_importance(X, y, estimator=None, n_repeats=N_REPEATS, drop_column=False,
+                         n_jobs=None, min_pct=MIN_IMPORTANCE_PCT, val_size=0.25, random_state=42):
+    """
+    Fit once on part of X, score feature importance on the held-out rest
+    and prune. Pass only training data; the test split stays untouched.
+
+    Returns (features, report) where report has a 'keep' column and, with
+    drop_column=True, a drop_column_mae_increase column.
+    """
+    estimator = estimator if estimator is not None else RandomForestRegressor(random_state=random_state)
+    X_fit, X_val, y_fit, y_val = train_test_split(X, y, test_size=val_size, random_state=random_state)
+    model = clone(estimator).fit(X_fit, y_fit)
+
+    baseline_mae, report = permutation_importance(model, X_val, y_val, n_repeats, n_jobs, random_state)
+    if drop_column:
+        report = report.join(drop_column_importance(estimator, X_fit, y_fit, X_val, y_val,
+                                                    baseline_mae, n_jobs))
+
+    features = prune_features(report, baseline_mae, X.columns, min_pct)
+    report['keep'] = report.index.isin(features)
+    report['rank'] = np.arange(1, len(report) + 1)
+    report.attrs['baseline_mae'] = baseline_mae
+    return features, report
+
+
+def print_importance(report):
+    print(f"\nFeature importance on the validation split "
+          f"(baseline MAE RM {report.attrs['baseline_mae']:,.2f}):")
+    print(report.round(4).to_string())
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == "__main__":
+    import argparse
+    from dataset import load_used_cars
+    from pricing import encode_listings
+
+    parser = argparse.ArgumentParser(description="Rank features by permutation importance")
+    parser.add_argument('--data', default=USED_CAR)
+    parser.add_argument('--repeats', type=int, default=N_REPEATS)
+    parser.add_argument('--drop-column', action='store_true',
+                        help="Also refit without each feature (one fit per feature)")
+    parser.add_argument('--jobs', type=int, default=None, help="Worker processes (default: all CPUs)")
+    parser.add_argument('--min-pct', type=float, default=MIN_IMPORTANCE_PCT)
+    parser.add_argument('--output', help="Write the ranked report as CSV")
+    args = parser.parse_args()
+
+    df = load_used_cars(args.data)
+    X, y = encode_listings(df), df['current_price(RM)']
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.3, random_state=42)
+
+    start = time.perf_counter()
+    features, report = select_by_importance(X_train, y_train, n_repeats=args.repeats,
+                                            drop_column=args.drop_column, n_jobs=args.jobs,
+                                            min_pct=args.min_pct)
+    elapsed = time.perf_counter() - start
+
+    print_importance(report)
+    print(f"\nSelected {len(features)} of {len(X.columns)} features in {elapsed:.1f} s: {features}")
+    if args.output:
+        report.to_csv(args.output)
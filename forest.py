@@ -0,0 +1,64 @@
+# forest.py
+import numpy as np
+
+TREE_LEAF = -1
+
+
+# ============================================================================
+# FLAT FOREST ARRAYS
+# ============================================================================
+def flatten_forest(model):
+    """
+    Node arrays of every tree in a fitted forest, concatenated.
+
+    Child indices stay local to their tree (TREE_LEAF at leaves), leaf
+    features are set to 0 so they can be used as indices, and roots[t] is
+    the position of tree t's first node. is_leaf marks leaf nodes.
+    """
+    trees = [est.tree_ for est in model.estimators_]
+    left = np.concatenate([tree.children_left for tree in trees])
+    right = np.concatenate([tree.children_right for tree in trees])
+    is_leaf = left == TREE_LEAF
+    feature = np.where(is_leaf, 0, np.concatenate([tree.feature for tree in trees]))
+    return {
+        'left': left,
+        'right': right,
+        'is_leaf': is_leaf,
+        'feature': feature,
+        'threshold': np.concatenate([tree.threshold for tree in trees]),
+        'value': np.concatenate([tree.value[:, 0, 0] for tree in trees]),
+        'roots': np.cumsum([0] + [tree.node_count for tree in trees[:-1]]).astype(np.int64)
+    }
+
+
+def global_children(children, roots):
+    """Turn tree-local child indices into indices into the flat arrays"""
+    counts = np.diff(np.append(roots, len(children)))
+    offsets = np.repeat(roots, counts)
+    return np.where(children == TREE_LEAF, TREE_LEAF, children + offsets)
+
+
+# ============================================================================
+# LEVEL-BY-LEVEL WALK
+# ============================================================================
+def walk(n_samples, roots, is_leaf, next_node):
+    """
+    Walk every (row, tree) pair from its root to a leaf, one tree level at
+    a time for all pairs at once.
+
+    next_node(rows, trees, nodes) returns the flat index of the child each
+    walker moves to. Each level yields (rows, nodes, children); walkers
+    whose child is a leaf then stop. Trees that are a single root leaf
+    are never walked, so callers must account for their root value.
+    """
+    rows = np.repeat(np.arange(n_samples), len(roots))
+    trees = np.tile(np.arange(len(roots)), n_samples)
+    splits = ~is_leaf[roots[trees]]
+    rows, trees = rows[splits], trees[splits]
+    nodes = roots[trees]
+
+    while rows.size:
+        children = next_node(rows, trees, nodes)
+        yield rows, nodes, children
+        internal = ~is_leaf[children]
+        rows, trees, nodes = rows[internal], trees[internal], children[internal]
@@ -0,0 +1,292 @@
+# loadtest.py
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import itertools
+import threading
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from Generate_car import generate_rows
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+SERVE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serve.py')
+
+PERCENTILES = [50, 90, 95, 99]
+
+
+# ============================================================================
+# PAYLOADS
+# ============================================================================
+def listing_to_car(row):
+    """Turn a Generate_car.py listing into the car dict the app and API accept"""
+    battery = row['battery_kWh']
+    return {
+        'year': row['year'],
+        'battery_kwh': 0.0 if battery is None or battery != battery else float(battery),
+        'mileage': row['mileage'],
+        'retail_price': float(row['retail_price(RM)']),
+        'make': row['make'],
+        'turbo': 'Yes' if row['is_turbo'] is True else 'No',
+        'transmission': row['transmission']
+    }
+
+
+def make_payloads(n, seed=None):
+    """n synthetic cars drawn with the same rules as the training data"""
+    if seed is not None:
+        random.seed(seed)
+    return [listing_to_car(row) for row in generate_rows(n)]
+
+
+# ============================================================================
+# RESOURCE SAMPLING
+# ============================================================================
+def _proc_usage(pid):
+    """(cpu seconds, rss bytes) for a process, via psutil or /proc"""
+    if psutil is not None:
+        process = psutil.Process(pid)
+        times = process.cpu_times()
+        return times.user + times.system, process.memory_info().rss
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    ticks = os.sysconf('SC_CLK_TCK')
+    cpu = (int(fields[11]) + int(fields[12])) / ticks
+    with open(f'/proc/{pid}/statm') as f:
+        rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    return cpu, rss
+
+
+class ResourceSampler:
+    """Records CPU % and RSS of the given processes once per interval"""
+
+    def __init__(self, pids, interval=1.0):
+        self.pids = pids
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        start = time.perf_counter()
+        previous = {pid: _proc_usage(pid)[0] for pid in self.pids.values()}
+        while not self._stop.wait(self.interval):
+            elapsed = time.perf_counter() - start
+            for name, pid in self.pids.items():
+                try:
+                    cpu, rss = _proc_usage(pid)
+                except (OSError, ProcessLookupError):
+                    continue
+                self.samples.append({
+                    'time_s': round(elapsed, 2),
+                    'process': name,
+                    'cpu_pct': 100 * (cpu - previous[pid]) / self.interval,
+                    'rss_mb': rss / 1e6
+                })
+                previous[pid] = cpu
+
+
+# ============================================================================
+# LOAD GENERATION
+# ============================================================================
+def run_load(send, payloads, concurrency=8, rate=None, duration=10.0, batch_size=1):
+    """
+    Drive `send(cars)` for `duration` seconds and record each request.
+
+    With a rate, requests arrive open-loop as a Poisson process and latency
+    is measured from the scheduled arrival, so queueing delay counts
+    (no coordinated omission). Without a rate, `concurrency` workers send
+    back-to-back requests (closed loop).
+    """
+    results = []
+    lock = threading.Lock()
+    cursor = itertools.count()
+
+    def next_batch():
+        i = next(cursor) * batch_size
+        return [payloads[(i + j) % len(payloads)] for j in range(batch_size)]
+
+    def call(scheduled):
+        cars = next_batch()
+        try:
+            send(cars)
+            ok = True
+        except Exception:
+            ok = False
+        finished = time.perf_counter()
+        with lock:
+            results.append((scheduled - start, finished - scheduled, ok))
+
+    start = time.perf_counter()
+    deadline = start + duration
+
+    if rate:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            scheduled = start
+            while True:
+                scheduled += random.expovariate(rate)
+                if scheduled >= deadline:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(call, scheduled)
+    else:
+        def worker():
+            while time.perf_counter() < deadline:
+                call(time.perf_counter())
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def summarize(results, elapsed, batch_size=1):
+    latencies = np.array([latency for _, latency, ok in results if ok])
+    errors = sum(1 for _, _, ok in results if not ok)
+    summary = {
+        'requests': len(results),
+        'errors': errors,
+        'error_rate': errors / len(results) if results else 0.0,
+        'elapsed_s': elapsed,
+        'throughput_rps': len(latencies) / elapsed,
+        'cars_per_s': len(latencies) * batch_size / elapsed
+    }
+    if len(latencies):
+        for p, value in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)):
+            summary[f'p{p}_ms'] = value * 1000
+        summary['max_ms'] = latencies.max() * 1000
+    return summary
+
+
+# ============================================================================
+# TARGETS
+# ============================================================================
+def in_process_sender(registry_dir=None):
+    from pricing import predict_batch
+    from registry import REGISTRY, ModelRegistry
+
+    registry = ModelRegistry(registry_dir or REGISTRY)
+
+    def send(cars):
+        serving = registry.current
+        predict_batch(serving.model, cars, version=serving.version)
+    return send
+
+
+def http_sender(url, timeout=30.0):
+    def send(cars):
+        body = json.dumps({'cars': cars}).encode()
+        request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            response.read()
+    return send
+
+
+def start_server(port, wait=60.0):
+    """Start serve.py in a subprocess and wait until /health answers"""
+    process = subprocess.Popen([sys.executable, SERVE_SCRIPT, '--port', str(port)],
+                               stdout=subprocess.DEVNULL)
+    deadline = time.time() + wait
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Prediction server exited during startup")
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Prediction server did not become healthy in time")
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load test of the prediction path")
+    parser.add_argument('--target', choices=['inprocess', 'http'], default='inprocess')
+    parser.add_argument('--url', default=None,
+                        help="Existing /predict endpoint; omit with --target http to start serve.py")
+    parser.add_argument('--port', type=int, default=8601, help="Port for the started server")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=None,
+                        help="Open-loop arrival rate in requests/s (default: closed loop)")
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--batch-size', type=int, default=1, help="Cars per request")
+    parser.add_argument('--payloads', type=int, default=2000, help="Distinct synthetic cars to cycle through")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--sample-interval', type=float, default=1.0)
+    parser.add_argument('--output', help="Write the full report as JSON")
+    args = parser.parse_args(argv)
+
+    payloads = make_payloads(args.payloads, args.seed)
+    pids = {'loadgen': os.getpid()}
+    server = None
+
+    if args.target == 'inprocess':
+        send = in_process_sender()
+    else:
+        url = args.url
+        if url is None:
+            server = start_server(args.port)
+            pids['server'] = server.pid
+            url = f'http://127.0.0.1:{args.port}/predict'
+        send = http_sender(url)
+
+    sampler = ResourceSampler(pids, args.sample_interval)
+    sampler.start()
+    try:
+        results, elapsed = run_load(send, payloads, args.concurrency, args.rate,
+                                    args.duration, args.batch_size)
+    finally:
+        sampler.stop()
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    summary = summarize(results, elapsed, args.batch_size)
+    print(f"Target: {args.target}  concurrency: {args.concurrency}  "
+          f"rate: {args.rate or 'closed loop'}  batch size: {args.batch_size}")
+    for key, value in summary.items():
+        print(f"  {key:<15} {value:,.2f}" if isinstance(value, float) else f"  {key:<15} {value:,}")
+
+    if sampler.samples:
+        print("\nResources over time:")
+        print(f"  {'time_s':>7}  {'process':<8} {'cpu_pct':>8} {'rss_mb':>8}")
+        for sample in sampler.samples:
+            print(f"  {sample['time_s']:>7.1f}  {sample['process']:<8} "
+                  f"{sample['cpu_pct']:>8.1f} {sample['rss_mb']:>8.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'summary': summary, 'resources': sampler.samples}, f, indent=2)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,23 @@
 
 # app.py
 import os
-import pickle
 import numpy as np
 import pandas as pd
 import streamlit as st
 import plotly.graph_objects as go
 
+import metrics
+import profiling
+from comparables import COMPARABLES_INDEX, ComparablesIndex, build_and_save as build_comparables
+from drift import DriftMonitor
+from explain import ForestExplainer
+from market_cube import MARKET_CUBE, MarketCube, build_and_save as build_market_cube
+from registry import REGISTRY, ModelRegistry
+from validation import YEAR_RANGE, MILEAGE_RANGE, RETAIL_PRICE_RANGE, BATTERY_RANGE
+from pricing import BRAND_CODES, TRANSMISSION_CODES, MAX_COMPARE, encode_cars, predict_batch, predict_one
+
 PARENT_PATH = os.getcwd()
-DATA_PATH = os.path.join(PARENT_PATH, 'data')
-USED_CAR = os.path.join(DATA_PATH, 'malaysia_used_cars.csv')
+USED_CAR = os.path.join(PARENT_PATH, 'malaysia_used_cars.csv')
 
 MODELS = os.path.join(PARENT_PATH, 'models')
 RF_MODEL = os.path.join(MODELS, 'RF_regression.pkl')
@@ -82,16 +90,63 @@ st.markdown("""
 # LOAD MODEL
 # ============================================================================
 @st.cache_resource
-def load_model(model_path=RF_MODEL):
-    """Load the trained model"""
+def load_model(registry_dir=REGISTRY, model_path=RF_MODEL):
+    """Load the served model from the registry and watch for new versions"""
     try:
-        with open(model_path, 'rb') as file:
-            model = pickle.load(file)
-        return model
+        registry = ModelRegistry(registry_dir, fallback_path=model_path)
     except FileNotFoundError:
         st.error("⚠️ Model file not found! Please train and save the model first.")
         st.stop()
         return None
+    registry.start_watcher()
+    return registry
+
+@st.cache_resource
+def load_explainer(version, _model):
+    """Precompute the forest's node arrays for contribution breakdowns"""
+    with metrics.span('load_explainer'):
+        return ForestExplainer(_model)
+
+@st.cache_resource
+def load_drift_monitor(version, _reference):
+    """Shared input drift monitor for one model version; None without a reference"""
+    if _reference is None:
+        return None
+    return DriftMonitor(_reference)
+
+def is_stale(artifact_path, data_path):
+    """True when the dataset was modified after the prebuilt artifact"""
+    return os.path.exists(data_path) and os.path.getmtime(data_path) > os.path.getmtime(artifact_path)
+
+@st.cache_resource
+def load_comparables(index_path=COMPARABLES_INDEX, data_path=USED_CAR):
+    """Prebuilt comparables index, rebuilt from the dataset when missing or stale"""
+    with metrics.span('load_comparables'):
+        if os.path.exists(index_path) and not is_stale(index_path, data_path):
+            return ComparablesIndex.load(index_path)
+        if os.path.exists(data_path):
+            return build_comparables(data_path, index_path)
+    return None
+
+@st.cache_resource
+def load_market_cube(cube_path=MARKET_CUBE, data_path=USED_CAR):
+    """Prebuilt market aggregate cube, rebuilt from the dataset when missing or stale"""
+    with metrics.span('load_market_cube'):
+        if os.path.exists(cube_path) and not is_stale(cube_path, data_path):
+            return MarketCube.load(cube_path)
+        if os.path.exists(data_path):
+            return build_market_cube(data_path, cube_path)
+    return None
+
+FEATURE_LABELS = {
+    'is_turbo': 'Turbo',
+    'mileage': 'Mileage',
+    'make': 'Make',
+    'year': 'Year',
+    'retail_price(RM)': 'Retail Price',
+    'transmission': 'Transmission',
+    'battery_kWh': 'Battery Capacity'
+}
 
 # ============================================================================
 # MAIN APP
@@ -103,8 +158,15 @@ def main():
     st.markdown('<p class="sub-header">Enter vehicle details to predict the current price</p>', 
                 unsafe_allow_html=True)
     
-    # Load model
-    model = load_model()
+    # Expose timings when CARPRICE_METRICS is set
+    metrics.start_exporter()
+    
+    # Load model (one consistent version for the whole rerun)
+    serving = load_model().current
+    model = serving.model
+    monitor = load_drift_monitor(serving.version, serving.drift_reference)
+    comparables = load_comparables()
+    market = load_market_cube()
     
     # Create two columns for better layout
     col1, col2 = st.columns([1, 1], gap="large")
@@ -120,8 +182,8 @@ def main():
         st.markdown("#### 🗓️ Year")
         year = st.slider(
             "Select the manufacturing year",
-            min_value=2015,
-            max_value=2024,
+            min_value=YEAR_RANGE[0],
+            max_value=YEAR_RANGE[1],
             value=2021,
             step=1,
             help="The year the vehicle was manufactured",
@@ -134,8 +196,8 @@ def main():
         st.markdown("#### 🔋 Battery Capacity (kWh) \nNote: Please input 0 for Non EV")
         battery_kwh = st.number_input(
             "Enter battery capacity in kilowatt-hours",
-            min_value=0.0,
-            max_value=120.0,
+            min_value=BATTERY_RANGE[0],
+            max_value=BATTERY_RANGE[1],
             value=65.62,
             step=0.1,
             help="Battery capacity determines the vehicle's range",
@@ -148,8 +210,8 @@ def main():
         st.markdown("#### 🛣️ Mileage (km)")
         mileage = st.number_input(
             "Enter total distance traveled",
-            min_value=0,
-            max_value=300000,
+            min_value=MILEAGE_RANGE[0],
+            max_value=MILEAGE_RANGE[1],
             value=50000,
             step=1000,
             help="Total kilometers the vehicle has traveled",
@@ -162,8 +224,8 @@ def main():
         st.markdown("#### 💵 Original Retail Price (RM)")
         retail_price = st.number_input(
             "Enter the original retail price when new",
-            min_value=30000.0,
-            max_value=800000.0,
+            min_value=RETAIL_PRICE_RANGE[0],
+            max_value=RETAIL_PRICE_RANGE[1],
             value=250000.0,
             step=5000.0,
             help="The original manufacturer's retail price when the vehicle was new",
@@ -175,29 +237,14 @@ def main():
         # -------------------------------
         # Make (Brand) - allowed list
         # -------------------------------
-        allowed_brands = {
-            "Proton": 0,
-            "Perodua": 1,
-            "Toyota": 2,
-            "Honda": 3,
-            "Nissan": 4,
-            "Mazda": 5,
-            "BMW": 6,
-            "Mercedes": 7,
-            "Volkswagen": 8,
-            "BYD": 9,
-            "Tesla": 10
-        }
-
         st.markdown("#### 🏭 Make (Brand)")
         make_name = st.selectbox(
             "Select vehicle brand",
-            options=list(allowed_brands.keys()),
+            options=list(BRAND_CODES.keys()),
             help="Vehicle manufacturer",
             label_visibility="collapsed"
         )
 
-        make = allowed_brands[make_name]  # numeric code for model
         st.markdown(f"**Selected Brand:** {make_name}")
         st.markdown("")
 
@@ -210,7 +257,6 @@ def main():
             help="Does the vehicle have turbo?",
             label_visibility="collapsed"
         )
-        turbo_value = 1 if turbo == "Yes" else 0
         st.markdown(f"**Turbo:** {turbo}")    
         st.markdown("")
         
@@ -219,25 +265,34 @@ def main():
     
         transmission = st.radio(
             "Select transmission type",
-            options=["Automatic", "CVT", "DCT", "Manual"],
+            options=list(TRANSMISSION_CODES.keys()),
             help="Type of transmission system",
             label_visibility="collapsed"
         )
         st.markdown(f"**Selected Transmission:** {transmission}")
         st.markdown("")
         
-        transmission_map = {
-            "Automatic": 0,
-            "CVT": 1,
-            "DCT": 2,
-            "Manual": 3
+        car = {
+            'year': year,
+            'battery_kwh': battery_kwh,
+            'mileage': mileage,
+            'retail_price': retail_price,
+            'make': make_name,
+            'turbo': turbo,
+            'transmission': transmission
         }
-        transmission_encoded = transmission_map[transmission]
-        
         
         # Predict Button
         st.markdown("---")
         predict_button = st.button("🎯 PREDICT PRICE", use_container_width=True)
+        compare_button = st.button("➕ ADD TO COMPARISON", use_container_width=True)
+        
+        comparison = st.session_state.setdefault('comparison', [])
+        if compare_button:
+            if len(comparison) >= MAX_COMPARE:
+                st.warning(f"⚠️ Comparison is limited to {MAX_COMPARE} vehicles. Clear it to start again.")
+            else:
+                comparison.append(car)
     
     # ========================================================================
     # RIGHT COLUMN - PREDICTION RESULTS
@@ -247,34 +302,12 @@ def main():
         st.markdown("---")
         
         if predict_button:
-            # Prepare input data (including retail_price)
-            input_data = pd.DataFrame({
-                'is_turbo': [turbo_value],
-                'mileage': [mileage],
-                'make': [make],
-                'year': [year],
-                'retail_price(RM)': [retail_price],
-                'transmission': [transmission_encoded],
-                'battery_kWh': [battery_kwh]
-            })
-            
-            # # Prepare input data (without retail_price)
-            # input_data = pd.DataFrame({
-            #     'year': [year],
-            #     'battery_kWh': [battery_kwh],
-            #     'mileage': [mileage],
-            #     'make': [make],
-            #     'is_turbo': [turbo_value],
-            #     'transmission': [transmission]
-            # })
-            
             # Make prediction
             with st.spinner('🔄 Calculating prediction...'):
-                prediction = model.predict(input_data)[0]
-            
-            # Calculate depreciation
-            depreciation_amount = retail_price - prediction
-            depreciation_percent = (depreciation_amount / retail_price) * 100
+                result = predict_one(model, car, monitor, serving.version)
+            prediction = result['predicted_price']
+            depreciation_amount = result['depreciation_amount']
+            depreciation_percent = result['depreciation_percent']
             
             # Display main prediction
             st.markdown(f"""
@@ -283,6 +316,7 @@ def main():
                 <p class="prediction-value">RM {prediction:,.2f}</p>
             </div>
             """, unsafe_allow_html=True)
+            st.caption(f"Model version: {serving.version}")
             
             # Display depreciation info
             col_dep1, col_dep2 = st.columns(2)
@@ -294,7 +328,7 @@ def main():
                     delta_color="inverse"
                 )
             with col_dep2:
-                retention_rate = 100 - depreciation_percent
+                retention_rate = result['retention_rate']
                 st.metric(
                     "Value Retention", 
                     f"{retention_rate:.1f}%",
@@ -333,89 +367,130 @@ def main():
             
             # Gauge Chart
             st.markdown("#### 📈 Price Indicator")
-            fig = go.Figure(go.Indicator(
-                mode="gauge+number",
-                value=prediction,
-                domain={'x': [0, 1], 'y': [0, 1]},
-                title={'text': "Price (RM)", 'font': {'size': 20}},
-                number={'prefix': "RM ", 'font': {'size': 30}},
-                gauge={
-                    'axis': {'range': [None, retail_price * 1.2], 'tickwidth': 1},
-                    'bar': {'color': "#667eea"},
-                    'bgcolor': "white",
-                    'borderwidth': 2,
-                    'bordercolor': "gray",
-                    'steps': [
-                        {'range': [0, retail_price * 0.3], 'color': '#ffcdd2'},
-                        {'range': [retail_price * 0.3, retail_price * 0.6], 'color': '#fff9c4'},
-                        {'range': [retail_price * 0.6, retail_price * 0.9], 'color': '#c8e6c9'},
-                        {'range': [retail_price * 0.9, retail_price * 1.2], 'color': '#a5d6a7'}
-                    ],
-                    'threshold': {
-                        'line': {'color': "red", 'width': 4},
-                        'thickness': 0.75,
-                        'value': prediction
+            with metrics.span('render_gauge'):
+                fig = go.Figure(go.Indicator(
+                    mode="gauge+number",
+                    value=prediction,
+                    domain={'x': [0, 1], 'y': [0, 1]},
+                    title={'text': "Price (RM)", 'font': {'size': 20}},
+                    number={'prefix': "RM ", 'font': {'size': 30}},
+                    gauge={
+                        'axis': {'range': [None, retail_price * 1.2], 'tickwidth': 1},
+                        'bar': {'color': "#667eea"},
+                        'bgcolor': "white",
+                        'borderwidth': 2,
+                        'bordercolor': "gray",
+                        'steps': [
+                            {'range': [0, retail_price * 0.3], 'color': '#ffcdd2'},
+                            {'range': [retail_price * 0.3, retail_price * 0.6], 'color': '#fff9c4'},
+                            {'range': [retail_price * 0.6, retail_price * 0.9], 'color': '#c8e6c9'},
+                            {'range': [retail_price * 0.9, retail_price * 1.2], 'color': '#a5d6a7'}
+                        ],
+                        'threshold': {
+                            'line': {'color': "red", 'width': 4},
+                            'thickness': 0.75,
+                            'value': prediction
+                        }
                     }
-                }
+                ))
+                fig.update_layout(height=300, margin=dict(l=20, r=20, t=50, b=20))
+                st.plotly_chart(fig, use_container_width=True)
+            
+            # Feature contributions
+            st.markdown("#### 🧭 What Drove This Price")
+            explainer = load_explainer(serving.version, model)
+            with metrics.span('explain'):
+                contributions = explainer.explain_frame(encode_cars([car])[explainer.feature_names]).iloc[0]
+            contributions = contributions.rename(FEATURE_LABELS).sort_values()
+            
+            fig = go.Figure(go.Bar(
+                x=contributions.values,
+                y=contributions.index,
+                orientation='h',
+                marker_color=['#e57373' if v < 0 else '#81c784' for v in contributions.values],
+                text=[f"RM {v:+,.0f}" for v in contributions.values],
+                textposition='auto'
             ))
-            fig.update_layout(height=300, margin=dict(l=20, r=20, t=50, b=20))
+            fig.update_layout(
+                height=320,
+                margin=dict(l=20, r=20, t=20, b=20),
+                xaxis_title="Contribution to price (RM)"
+            )
             st.plotly_chart(fig, use_container_width=True)
+            st.caption(
+                f"Starting from the average price of RM {explainer.bias:,.0f}, each bar shows "
+                f"how much that feature moved this prediction up or down."
+            )
             
-            # Additional insights
+            # Insights from the features that moved this prediction most
             st.markdown("#### 💡 Insights")
-            
-            # Age-based insight
-            vehicle_age = 2024 - year
-            if vehicle_age <= 2:
-                age_insight = "🟢 Very new vehicle - premium pricing expected"
-            elif vehicle_age <= 4:
-                age_insight = "🟡 Relatively new - good value retention"
-            else:
-                age_insight = "🟠 Older vehicle - depreciation affects price"
-            
-            # Mileage-based insight
-            if mileage < 30000:
-                mileage_insight = "🟢 Low mileage - excellent condition"
-            elif mileage < 80000:
-                mileage_insight = "🟡 Moderate mileage - average wear"
-            else:
-                mileage_insight = "🟠 High mileage - consider maintenance costs"
-            
-            # Battery-based insight
-            if battery_kwh >= 75:
-                battery_insight = "🟢 Large battery - extended range capability"
-            elif battery_kwh >= 60:
-                battery_insight = "🟡 Standard battery - adequate for daily use"
-            else:
-                battery_insight = "🟠 Smaller battery - limited range"
-            
-            # Depreciation insight
-            if depreciation_percent < 20:
-                depreciation_insight = "🟢 Excellent value retention - low depreciation"
-            elif depreciation_percent < 40:
-                depreciation_insight = "🟡 Normal depreciation rate for EVs"
-            else:
-                depreciation_insight = "🟠 High depreciation - consider negotiation"
-            
-            st.markdown(f"""
-            <div class="feature-card">
-                <strong>Vehicle Age:</strong> {vehicle_age} years<br>
-                <span style="color: #000000;">{age_insight}</span>
-            </div>
+            input_values = {
+                'Turbo': turbo,
+                'Mileage': f"{mileage:,} km",
+                'Make': make_name,
+                'Year': year,
+                'Retail Price': f"RM {retail_price:,.0f}",
+                'Transmission': transmission,
+                'Battery Capacity': f"{battery_kwh:g} kWh"
+            }
+            strongest = contributions.abs().sort_values(ascending=False).index[:3]
+            cards = []
+            for label in strongest:
+                amount = contributions[label]
+                direction = "🟢 Raised" if amount >= 0 else "🟠 Lowered"
+                cards.append(f"""
             <div class="feature-card">
-                <strong>Mileage Status:</strong><br>
-                <span style="color: #000000;">{mileage_insight}</span>
-            </div>
-            <div class="feature-card">
-                <strong>Battery Assessment:</strong><br>
-                <span style="color: #000000;">{battery_insight}</span>
-            </div>
+                <strong>{label}:</strong> {input_values.get(label, '')}<br>
+                <span style="color: #000000;">{direction} the predicted price by RM {abs(amount):,.0f}</span>
+            </div>""")
+            cards.append(f"""
             <div class="feature-card">
-                <strong>Depreciation Analysis:</strong><br>
-                <span style="color: #000000;">{depreciation_insight}</span><br>
-                <small style="color: #000000;">Depreciated by RM {depreciation_amount:,.0f} ({depreciation_percent:.1f}%)</small>
-            </div>
-            """, unsafe_allow_html=True)
+                <strong>Depreciation:</strong><br>
+                <small style="color: #000000;">Depreciated by RM {depreciation_amount:,.0f} ({depreciation_percent:.1f}%) from retail</small>
+            </div>""")
+            st.markdown("".join(cards), unsafe_allow_html=True)
+            
+            # Market statistics for the closest segment with listings
+            if market is not None:
+                segments = [
+                    (f"{make_name} {year} {transmission}", dict(make=make_name, year=year, transmission=transmission)),
+                    (f"{make_name} {year}", dict(make=make_name, year=year)),
+                    (make_name, dict(make=make_name))
+                ]
+                # Roll up until the segment has enough listings to be meaningful
+                for segment_name, segment in segments:
+                    with metrics.span('market_query'):
+                        stats = market.query(**segment)
+                    if stats is not None and stats['count'] >= 5:
+                        break
+                if stats is not None:
+                    st.markdown(f"#### 🏷️ Market Segment: {segment_name}")
+                    col_m1, col_m2, col_m3 = st.columns(3)
+                    with col_m1:
+                        st.metric("Listings", f"{stats['count']:,}")
+                    with col_m2:
+                        st.metric("Median Price", f"RM {stats['p50']:,.0f}")
+                    with col_m3:
+                        st.metric("Middle 50%", f"RM {stats['p25']:,.0f} - {stats['p75']:,.0f}")
+            
+            # Similar cars actually in the dataset
+            if comparables is not None:
+                st.markdown("#### 🔎 Comparable Listings")
+                with metrics.span('comparables'):
+                    similar = comparables.query(car, k=5)
+                if len(similar):
+                    comparables_df = pd.DataFrame({
+                        'Car': similar['make'].astype(str) + ' ' + similar['model'].astype(str) + ' ' + similar['trim'].astype(str),
+                        'Year': similar['year'].astype(str),
+                        'Mileage': similar['mileage'].map(lambda v: f"{v:,} km"),
+                        'Transmission': similar['transmission'].astype(str),
+                        'Location': similar['location'].astype(str),
+                        'Retail Price': similar['retail_price(RM)'].map(lambda v: f"RM {v:,.0f}"),
+                        'Current Price': similar['current_price(RM)'].map(lambda v: f"RM {v:,.0f}")
+                    })
+                    st.dataframe(comparables_df, use_container_width=True, hide_index=True)
+                else:
+                    st.info("No listings of this make in the dataset yet.")
             
         else:
             # Show placeholder when no prediction yet
@@ -429,6 +504,37 @@ def main():
             })
             st.dataframe(example_df, use_container_width=True, hide_index=True)
     
+    # ========================================================================
+    # COMPARISON
+    # ========================================================================
+    comparison = st.session_state['comparison']
+    if comparison:
+        st.markdown("---")
+        st.markdown(f"### 🔀 Side-by-Side Comparison ({len(comparison)}/{MAX_COMPARE})")
+        
+        # All configurations are priced in one batched call
+        with st.spinner('🔄 Pricing all vehicles...'):
+            results = predict_batch(model, comparison, version=serving.version)
+        
+        comparison_df = pd.DataFrame({
+            'Make': results['make'],
+            'Year': results['year'].astype(str),
+            'Mileage': results['mileage'].map(lambda v: f"{v:,} km"),
+            'Battery': results['battery_kwh'].map(lambda v: f"{v:.2f} kWh"),
+            'Turbo': results['turbo'],
+            'Transmission': results['transmission'],
+            'Retail Price': results['retail_price'].map(lambda v: f"RM {v:,.0f}"),
+            'Predicted Price': results['predicted_price'].map(lambda v: f"RM {v:,.0f}"),
+            'Depreciation': results['depreciation_amount'].map(lambda v: f"RM {v:,.0f}"),
+            'Value Retention': results['retention_rate'].map(lambda v: f"{v:.1f}%")
+        })
+        st.dataframe(comparison_df, use_container_width=True, hide_index=True)
+        st.caption(f"Model version: {serving.version}")
+        
+        if st.button("🗑️ CLEAR COMPARISON"):
+            comparison.clear()
+            st.rerun()
+    
     # ========================================================================
     # FOOTER
     # ========================================================================
@@ -446,4 +552,6 @@ def main():
 # RUN APP
 # ============================================================================
 if __name__ == "__main__":
-    main()
+    # Profile each rerun when CARPRICE_PROFILE / CARPRICE_PROFILE_MEMORY is set
+    with profiling.profiled('app_request'):
+        main()
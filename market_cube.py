@@ -0,0 +1,193 @@
+# market_cube.py
+import os
+import time
+import pickle
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from dataset import load_used_cars
+
+PARENT_PATH = os.getcwd()
+USED_CAR = os.path.join(PARENT_PATH, 'malaysia_used_cars.csv')
+
+MODELS = os.path.join(PARENT_PATH, 'models')
+MARKET_CUBE = os.path.join(MODELS, 'market_cube.pkl')
+
+DIMENSIONS = ['make', 'model', 'year', 'fuel_type', 'transmission', 'location', 'condition']
+PRICE = 'current_price(RM)'
+
+# Log-spaced price histogram used as a mergeable quantile sketch;
+# 128 bins over RM 1k-2M keep quantile error within about 3%
+SKETCH_EDGES = np.geomspace(1_000, 2_000_000, 129)
+N_BINS = len(SKETCH_EDGES) - 1
+
+# Cell layout: [count, sum, histogram bins...]
+COUNT, SUM, HIST = 0, 1, 2
+
+
+def _aggregate(keys, group, n_groups, price=None, vectors=None):
+    """
+    Sum rows into one cell vector per group id, returning (keys, cells)
+    where keys holds the dimension values of each group's first row.
+    """
+    if vectors is None:
+        bins = np.clip(np.searchsorted(SKETCH_EDGES, price, side='right') - 1, 0, N_BINS - 1)
+        cells = np.zeros((n_groups, HIST + N_BINS))
+        cells[:, COUNT] = np.bincount(group, minlength=n_groups)
+        cells[:, SUM] = np.bincount(group, weights=price, minlength=n_groups)
+        cells[:, HIST:] = np.bincount(group * N_BINS + bins,
+                                      minlength=n_groups * N_BINS).reshape(n_groups, N_BINS)
+    else:
+        cells = pd.DataFrame(vectors).groupby(group).sum().to_numpy(copy=True)
+    _, first = np.unique(group, return_index=True)
+    group_keys = list(zip(*(column[first].tolist() for column in keys))) if keys else [()]
+    return group_keys, cells
+
+
+def _quantile(histogram, q):
+    """Estimate a quantile from sketch counts, interpolating inside the bin"""
+    cumulative = np.cumsum(histogram)
+    target = q * cumulative[-1]
+    i = int(np.searchsorted(cumulative, target, side='left'))
+    below = cumulative[i - 1] if i else 0.0
+    fraction = (target - below) / histogram[i] if histogram[i] else 0.0
+    low, high = SKETCH_EDGES[i], SKETCH_EDGES[i + 1]
+    return float(low * (high / low) ** fraction)
+
+
+# ============================================================================
+# AGGREGATE CUBE
+# ============================================================================
+class MarketCube:
+    """
+    Count, price sum and price sketch for every combination of DIMENSIONS.
+
+    All 2^7 group-bys (cuboids) are materialized as dicts from key tuples
+    to cell vectors, so any query, whether drilled down or rolled up, is a
+    single dict lookup. Building takes one pass over the rows to fill the
+    finest cuboid; every coarser cuboid is then summed from those cells
+    rather than from the raw rows. append() folds new rows into all
+    cuboids without rebuilding.
+    """
+
+    def __init__(self):
+        self.cuboids = {
+            dims: {}
+            for size in range(len(DIMENSIONS) + 1)
+            for dims in combinations(DIMENSIONS, size)
+        }
+
+    @classmethod
+    def build(cls, df):
+        cube = cls()
+        cube.append(df)
+        return cube
+
+    def append(self, df):
+        """Add new listings to every cuboid"""
+        if not len(df):
+            return
+        # One pass over the rows: aggregate into the finest cuboid
+        grouped = df.groupby(DIMENSIONS, sort=False, dropna=False, observed=True)
+        base_keys, base_cells = _aggregate(
+            [df[dim].to_numpy() for dim in DIMENSIONS],
+            grouped.ngroup().to_numpy(), grouped.ngroups,
+            price=df[PRICE].to_numpy(dtype=float)
+        )
+        base = pd.DataFrame(base_keys, columns=DIMENSIONS)
+
+        # Roll the new base cells up into every cuboid and merge
+        for dims, cells in self.cuboids.items():
+            if dims:
+                grouped = base.groupby(list(dims), sort=False, dropna=False, observed=True)
+                group = grouped.ngroup().to_numpy()
+            else:
+                group = np.zeros(len(base), dtype=np.int64)
+            keys, vectors = _aggregate([base[dim].to_numpy() for dim in dims], group,
+                                       group.max() + 1, vectors=base_cells)
+            for key, vector in zip(keys, vectors):
+                cell = cells.get(key)
+                if cell is None:
+                    cells[key] = vector
+                else:
+                    cell += vector
+
+    def cell(self, **filters):
+        """Raw cell vector for the given dimension values, or None"""
+        unknown = set(filters) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {sorted(unknown)}")
+        dims = tuple(dim for dim in DIMENSIONS if dim in filters)
+        key = tuple(filters[dim] for dim in dims)
+        return self.cuboids[dims].get(key)
+
+    def query(self, quantiles=(0.25, 0.5, 0.75), **filters):
+        """
+        Segment statistics for any subset of dimensions, e.g.
+        cube.query(make='Honda', year=2020, transmission='CVT', location='Selangor').
+        Dimensions left out are rolled up. Returns None for empty segments.
+        """
+        cell = self.cell(**filters)
+        if cell is None or cell[COUNT] == 0:
+            return None
+        stats = {
+            'count': int(cell[COUNT]),
+            'mean': float(cell[SUM] / cell[COUNT])
+        }
+        histogram = cell[HIST:]
+        for q in quantiles:
+            stats[f'p{int(q * 100)}'] = _quantile(histogram, q)
+        return stats
+
+    def breakdown(self, dim, **filters):
+        """Statistics per value of `dim` within the filtered segment"""
+        dims = tuple(d for d in DIMENSIONS if d in filters or d == dim)
+        position = dims.index(dim)
+        fixed = [(dims.index(d), value) for d, value in filters.items()]
+        rows = {}
+        for key in self.cuboids[dims]:
+            if all(key[i] == value for i, value in fixed):
+                rows[key[position]] = self.query(**filters, **{dim: key[position]})
+        return rows
+
+    def save(self, path=MARKET_CUBE):
+        # Only the cuboid dicts are stored, so the file loads the same
+        # whichever module (or __main__) the cube was built from
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(self.cuboids, f)
+
+    @classmethod
+    def load(cls, path=MARKET_CUBE):
+        cube = cls.__new__(cls)
+        with open(path, 'rb') as f:
+            cube.cuboids = pickle.load(f)
+        return cube
+
+
+# ============================================================================
+# BUILD OFFLINE
+# ============================================================================
+def build_and_save(data_path=USED_CAR, path=MARKET_CUBE):
+    """Build the cube from the listings CSV and save it"""
+    cube = MarketCube.build(load_used_cars(data_path))
+    cube.save(path)
+    return cube
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    cube = build_and_save()
+    build_time = time.perf_counter() - start
+
+    n_cells = sum(len(cells) for cells in cube.cuboids.values())
+    n_rows = int(cube.cell()[COUNT])
+    print(f"Built {len(cube.cuboids)} cuboids ({n_cells:,} cells) from {n_rows:,} rows "
+          f"in {build_time * 1000:.1f} ms; saved to {MARKET_CUBE}")
+
+    start = time.perf_counter()
+    stats = cube.query(make='Honda', year=2020, transmission='CVT')
+    query_time = time.perf_counter() - start
+    print(f"Honda 2020 CVT: {stats} ({query_time * 1e6:.0f} µs)")
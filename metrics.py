@@ -0,0 +1,280 @@
+# metrics.py
+import os
+import time
+import atexit
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+# Metrics are off unless CARPRICE_METRICS is set; when off, spans and
+# counters are no-ops so the hot path pays only a flag check.
+ENABLED = os.environ.get('CARPRICE_METRICS', '').lower() in ('1', 'true', 'yes')
+METRICS_FILE = os.environ.get('CARPRICE_METRICS_FILE', '')
+METRICS_PORT = int(os.environ.get('CARPRICE_METRICS_PORT', '0') or 0)
+
+PREFIX = 'carprice'
+
+# Latency buckets in seconds, from sub-millisecond predicts to full training runs
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+# ============================================================================
+# METRIC TYPES
+# ============================================================================
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = []
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+
+class Gauge:
+    """Last-value gauge keyed by label values"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def set(self, value, labels=()):
+        with self.lock:
+            self.values[labels] = value
+
+    def render(self):
+        lines = []
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative latency histogram keyed by label values"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = []
+        for labels, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = labels + (('le', repr(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            inf_labels = labels + (('le', '+Inf'),)
+            lines.append(f"{self.name}_bucket{_format_labels(inf_labels)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _get(metric_type, name, help_text):
+    metric = _registry.get(name)
+    if metric is None:
+        with _registry_lock:
+            metric = _registry.setdefault(name, metric_type(name, help_text))
+    return metric
+
+
+STAGE_SECONDS = f'{PREFIX}_stage_seconds'
+STAGE_ERRORS = f'{PREFIX}_stage_errors_total'
+
+
+def inc(name, amount=1, **labels):
+    """Increment counter <prefix>_<name>_total"""
+    if not ENABLED:
+        return
+    counter = _get(Counter, f'{PREFIX}_{name}_total', f'Total {name.replace("_", " ")}')
+    counter.inc(tuple(sorted(labels.items())), amount)
+
+
+def set_gauge(name, value, **labels):
+    """Set gauge <prefix>_<name> to its latest value"""
+    if not ENABLED:
+        return
+    gauge = _get(Gauge, f'{PREFIX}_{name}', f'Latest {name.replace("_", " ")}')
+    gauge.set(value, tuple(sorted(labels.items())))
+
+
+def observe(stage, seconds):
+    """Record one duration for a stage in the latency histogram"""
+    if not ENABLED:
+        return
+    histogram = _get(Histogram, STAGE_SECONDS, 'Time spent per stage in seconds')
+    histogram.observe(seconds, (('stage', stage),))
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+@contextmanager
+def _timed_span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        _get(Counter, STAGE_ERRORS, 'Stages that raised').inc((('stage', stage),))
+        raise
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def span(stage):
+    """
+    Time a block of code as one stage:
+
+        with metrics.span('predict'):
+            model.predict(X)
+
+    Each span feeds the <prefix>_stage_seconds histogram (whose _count is
+    the call counter) and counts exceptions in <prefix>_stage_errors_total.
+    """
+    if not ENABLED:
+        return _NULL_SPAN
+    return _timed_span(stage)
+
+
+def timed(stage=None):
+    """Decorator form of span(); returns the function untouched when disabled"""
+    def decorator(func):
+        if not ENABLED:
+            return func
+        name = stage or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _timed_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for name in sorted(_registry):
+        metric = _registry[name]
+        with metric.lock:
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def write_file(path=None):
+    """Atomically write the current metrics to a text file"""
+    path = path or METRICS_FILE
+    if not ENABLED or not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as file:
+        file.write(render())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+
+
+def start_exporter(port=None):
+    """
+    Serve /metrics on localhost and/or write the metrics file at exit,
+    depending on configuration. Safe to call on every Streamlit rerun.
+    """
+    global _server
+    if not ENABLED:
+        return
+    with _registry_lock:
+        if _server is not None:
+            return
+        port = port or METRICS_PORT
+        if port:
+            _server = ThreadingHTTPServer(('127.0.0.1', port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+        else:
+            _server = False
+        if METRICS_FILE:
+            atexit.register(write_file)
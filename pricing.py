@@ -0,0 +1,144 @@
+# pricing.py
+import pandas as pd
+
+import metrics
+
+# ============================================================================
+# FEATURE ENCODING
+# ============================================================================
+# Column order the random forest was trained on
+FEATURES = [
+    'is_turbo',
+    'mileage',
+    'make',
+    'year',
+    'retail_price(RM)',
+    'transmission',
+    'battery_kWh'
+]
+
+BRAND_CODES = {
+    "Proton": 0,
+    "Perodua": 1,
+    "Toyota": 2,
+    "Honda": 3,
+    "Nissan": 4,
+    "Mazda": 5,
+    "BMW": 6,
+    "Mercedes": 7,
+    "Volkswagen": 8,
+    "BYD": 9,
+    "Tesla": 10
+}
+
+TRANSMISSION_CODES = {
+    "Automatic": 0,
+    "CVT": 1,
+    "DCT": 2,
+    "Manual": 3
+}
+
+TURBO_CODES = {
+    "Yes": 1,
+    "No": 0
+}
+
+# Maximum number of configurations in one side-by-side comparison
+MAX_COMPARE = 5
+
+
+def encode_cars(cars):
+    """
+    Build the model input frame for a list of car configurations.
+
+    Each car is a dict with the same fields the app collects:
+    year, battery_kwh, mileage, retail_price, make, turbo, transmission.
+    """
+    cars = pd.DataFrame(list(cars))
+    return pd.DataFrame({
+        'is_turbo': cars['turbo'].map(TURBO_CODES),
+        'mileage': cars['mileage'],
+        'make': cars['make'].map(BRAND_CODES),
+        'year': cars['year'],
+        'retail_price(RM)': cars['retail_price'],
+        'transmission': cars['transmission'].map(TRANSMISSION_CODES),
+        'battery_kWh': cars['battery_kwh']
+    }, columns=FEATURES)
+
+
+def encode_listings(df):
+    """
+    Build the model input frame from raw listings shaped like
+    malaysia_used_cars.csv. EVs have no turbo and petrol cars no battery,
+    so those gaps are encoded as 0 the same way the app asks users to.
+    """
+    # astype(object) lets categorical and nullable columns map like plain ones
+    is_turbo = df['is_turbo'].astype(object).map({True: 1, False: 0, 'True': 1, 'False': 0})
+    return pd.DataFrame({
+        'is_turbo': is_turbo.fillna(0).astype(int),
+        'mileage': df['mileage'],
+        'make': df['make'].astype(object).map(BRAND_CODES),
+        'year': df['year'],
+        'retail_price(RM)': df['retail_price(RM)'],
+        'transmission': df['transmission'].astype(object).map(TRANSMISSION_CODES),
+        'battery_kWh': df['battery_kWh'].fillna(0)
+    }, columns=FEATURES)
+
+
+def model_features(model):
+    """Columns the model was fitted on, which may be a pruned subset of FEATURES"""
+    return list(getattr(model, 'feature_names_in_', FEATURES))
+
+
+def predict_batch(model, cars, monitor=None, version=None):
+    """
+    Price several car configurations with a single model.predict call.
+
+    Returns one row per car with the predicted price, depreciation and
+    value retention, in the same order as the input. If a drift monitor
+    is given, the encoded inputs are added to its current window. The
+    model version, when given, is recorded on every result row.
+    """
+    cars = list(cars)
+    with metrics.span('build_input'):
+        input_data = encode_cars(cars)
+    with metrics.span('predict'):
+        prediction = model.predict(input_data[model_features(model)])
+    metrics.inc('predictions', len(cars), model_version=version or 'unknown')
+    if monitor is not None:
+        monitor.observe(input_data)
+
+    retail_price = input_data['retail_price(RM)'].to_numpy(dtype=float)
+    depreciation_amount = retail_price - prediction
+    depreciation_percent = (depreciation_amount / retail_price) * 100
+
+    results = pd.DataFrame(cars)
+    results['predicted_price'] = prediction
+    results['depreciation_amount'] = depreciation_amount
+    results['depreciation_percent'] = depreciation_percent
+    results['retention_rate'] = 100 - depreciation_percent
+    results['model_version'] = version
+    return results
+
+
+def predict_listings(model, df, version=None):
+    """
+    Price raw listings (CSV-shaped rows) with a single model.predict call.
+
+    Returns a copy of df with predicted_price and model_version columns.
+    """
+    with metrics.span('build_input'):
+        input_data = encode_listings(df)
+    with metrics.span('predict'):
+        prediction = model.predict(input_data[model_features(model)])
+    metrics.inc('predictions', len(df), model_version=version or 'unknown')
+
+    results = df.copy()
+    results['predicted_price'] = prediction
+    results['model_version'] = version
+    return results
+
+
+def predict_one(model, car, monitor=None, version=None):
+    """Price a single car configuration, returning one result row"""
+    return predict_batch(model, [car], monitor, version).iloc[0]
@@ -0,0 +1,156 @@
+# profiling.py
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+# CARPRICE_PROFILE selects the profiler for wrapped runs: 'cprofile'
+# (deterministic, pstats output) or 'sample' (stack sampling, collapsed
+# stacks for flame graphs). Unset means profiling is off.
+PROFILE_MODE = os.environ.get('CARPRICE_PROFILE', '').lower()
+PROFILE_DIR = os.environ.get('CARPRICE_PROFILE_DIR', os.path.join(os.getcwd(), 'profiles'))
+PROFILE_MEMORY = os.environ.get('CARPRICE_PROFILE_MEMORY', '').lower() in ('1', 'true', 'yes')
+SAMPLE_INTERVAL = float(os.environ.get('CARPRICE_PROFILE_INTERVAL', '0.005'))
+
+MODES = ('cprofile', 'sample')
+
+# Rows kept in the text summaries
+TOP_N = 30
+
+
+# ============================================================================
+# SAMPLING PROFILER
+# ============================================================================
+class StackSampler:
+    """
+    Samples one thread's Python stack at a fixed interval from a
+    background thread and counts identical stacks. The profiled code is
+    not instrumented, so overhead is roughly constant per sample.
+    """
+
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write_collapsed(self, path):
+        """Brendan Gregg collapsed-stack format, one 'a;b;c count' per line"""
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+# ============================================================================
+# PROFILED RUNS
+# ============================================================================
+def _write_memory_report(snapshot, peak, path):
+    stats = snapshot.statistics('lineno')
+    with open(path, 'w') as f:
+        f.write(f"Peak traced memory: {peak / 1e6:.2f} MB\n\n")
+        f.write(f"Top {TOP_N} allocation sites (live at end of run):\n")
+        for stat in stats[:TOP_N]:
+            f.write(f"{stat}\n")
+
+
+@contextmanager
+def _profile_run(name, mode, out_dir, memory):
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    base = os.path.join(out_dir, f"{name}-{stamp}-{os.getpid()}-{threading.get_ident()}")
+
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started_tracing = True
+    else:
+        started_tracing = False
+
+    profiler = sampler = None
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Only one deterministic profiler may run at a time (Python 3.12+),
+            # so concurrent runs fall back to sampling
+            profiler = None
+            mode = 'sample'
+    if mode == 'sample':
+        sampler = StackSampler()
+        sampler.start()
+
+    try:
+        yield base
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(base + '.pstats')
+            with open(base + '.txt', 'w') as f:
+                stats = pstats.Stats(profiler, stream=f)
+                stats.sort_stats('cumulative').print_stats(TOP_N)
+        if sampler is not None:
+            sampler.stop()
+            sampler.write_collapsed(base + '.collapsed')
+        if started_tracing:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            _write_memory_report(snapshot, peak, base + '.memory.txt')
+
+
+class _NullRun:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+def profiled(name, mode=None, out_dir=None, memory=None):
+    """
+    Profile a block of code when profiling is switched on:
+
+        with profiling.profiled('train'):
+            run()
+
+    Arguments override the CARPRICE_PROFILE* environment variables. Each
+    run writes <name>-<time>-<pid>-<thread>.* files to the output
+    directory: .pstats and a .txt summary for cprofile, .collapsed for
+    sample, and .memory.txt with the top allocators when memory tracking
+    is on (memory tracking also works without a CPU profiler). With
+    profiling off this is a no-op context manager.
+    """
+    mode = (mode if mode is not None else PROFILE_MODE).lower()
+    memory = PROFILE_MEMORY if memory is None else memory
+    if mode and mode not in MODES:
+        raise ValueError(f"Unknown profiler {mode!r}; expected one of {MODES}")
+    if not mode and not memory:
+        return _NullRun()
+    return _profile_run(name, mode, out_dir or PROFILE_DIR, memory)
@@ -0,0 +1,230 @@
+# quantize.py
+import os
+import io
+import pickle
+import numpy as np
+
+from forest import TREE_LEAF, flatten_forest, walk
+from timing import best_time
+
+PARENT_PATH = os.getcwd()
+USED_CAR = os.path.join(PARENT_PATH, 'malaysia_used_cars.csv')
+
+MODELS = os.path.join(PARENT_PATH, 'models')
+RF_MODEL = os.path.join(MODELS, 'RF_regression.pkl')
+COMPACT_MODEL = os.path.join(MODELS, 'RF_regression_compact.npz')
+
+
+def _round_down_float32(values):
+    """
+    Largest float32 <= each float64 value.
+
+    Trees compare float32 inputs against float64 thresholds, and no float32
+    lies between a threshold and its rounded-down value, so the split
+    decisions stay exactly the same.
+    """
+    rounded = values.astype(np.float32)
+    too_big = rounded.astype(np.float64) > values
+    rounded[too_big] = np.nextafter(rounded[too_big], np.float32(-np.inf))
+    return rounded
+
+
+# ============================================================================
+# COMPACT FOREST
+# ============================================================================
+class CompactForest:
+    """
+    Reduced-precision copy of a fitted RandomForestRegressor.
+
+    Nodes of all trees are packed into flat arrays: child indices are local
+    to their tree (int16 when every tree is small enough, else int32),
+    split features are int8, and leaf values are float32. Thresholds are
+    either float32 rounded down (mode='float32'), or, with mode='binned',
+    uint16 ranks into a per-feature table of the forest's distinct
+    thresholds, with inputs binned once per predict call. Both modes keep
+    every split decision identical to the original model; only the leaf
+    values lose precision.
+    """
+
+    def __init__(self, arrays, mode):
+        self.mode = mode
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.is_leaf = self.left == TREE_LEAF
+        self.n_features = int(arrays['n_features'])
+        # Per-feature sorted thresholds, only for binned mode
+        self.bin_edges = [arrays[f'bin_edges_{i}'] for i in range(self.n_features)
+                          if f'bin_edges_{i}' in arrays]
+        self.n_trees = len(self.roots)
+
+    @classmethod
+    def from_model(cls, model, mode='float32'):
+        if mode not in ('float32', 'binned'):
+            raise ValueError(f"Unknown mode: {mode}")
+        flat = flatten_forest(model)
+        n_features = model.n_features_in_
+        largest = max(est.tree_.node_count for est in model.estimators_)
+        index_dtype = np.int16 if largest <= np.iinfo(np.int16).max else np.int32
+
+        is_leaf = flat['is_leaf']
+        feature = flat['feature'].astype(np.int8)
+        threshold = flat['threshold']
+
+        arrays = {
+            'left': flat['left'].astype(index_dtype),
+            'right': flat['right'].astype(index_dtype),
+            'feature': feature,
+            'value': flat['value'].astype(np.float32),
+            'roots': flat['roots'],
+            'n_features': np.int64(n_features)
+        }
+
+        if mode == 'float32':
+            arrays['threshold'] = _round_down_float32(np.where(is_leaf, 0.0, threshold))
+        else:
+            ranks = np.zeros(len(threshold), dtype=np.uint16)
+            for i in range(n_features):
+                mask = ~is_leaf & (feature == i)
+                edges = np.unique(threshold[mask])
+                if len(edges) > np.iinfo(np.uint16).max:
+                    raise ValueError(f"Feature {i} has too many distinct thresholds to bin")
+                ranks[mask] = np.searchsorted(edges, threshold[mask])
+                arrays[f'bin_edges_{i}'] = edges
+            arrays['threshold'] = ranks
+
+        return cls(arrays, mode)
+
+    # ------------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------------
+    def arrays(self):
+        arrays = {
+            'left': self.left,
+            'right': self.right,
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'value': self.value,
+            'roots': self.roots,
+            'n_features': np.int64(self.n_features),
+            'mode': np.array(self.mode)
+        }
+        for i, edges in enumerate(self.bin_edges):
+            arrays[f'bin_edges_{i}'] = edges
+        return arrays
+
+    @property
+    def nbytes(self):
+        return sum(np.asarray(a).nbytes for a in self.arrays().values())
+
+    def save(self, path=COMPACT_MODEL):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(path, **self.arrays())
+
+    @classmethod
+    def load(cls, path=COMPACT_MODEL):
+        with np.load(path) as data:
+            arrays = {key: data[key] for key in data.files}
+        return cls(arrays, str(arrays['mode']))
+
+    # ------------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------------
+    def _prepare(self, X):
+        """Inputs in the form the stored thresholds are compared against"""
+        X = np.asarray(X, dtype=np.float32)
+        if self.mode == 'float32':
+            return X
+        # x <= edges[k]  <=>  searchsorted(edges, x, 'left') <= k
+        binned = np.empty(X.shape, dtype=np.int32)
+        for i, edges in enumerate(self.bin_edges):
+            binned[:, i] = np.searchsorted(edges, X[:, i].astype(np.float64), side='left')
+        return binned
+
+    def predict(self, X, chunk_size=2000):
+        """Mean leaf value over all trees for each row of X"""
+        X = self._prepare(X)
+        n_samples = X.shape[0]
+        predictions = np.empty(n_samples)
+        for start in range(0, n_samples, chunk_size):
+            stop = min(start + chunk_size, n_samples)
+            predictions[start:stop] = self._predict_chunk(X[start:stop])
+        return predictions
+
+    def _predict_chunk(self, X):
+        n_samples = X.shape[0]
+
+        # Trees that are a single leaf predict their root value for every row
+        root_leaves = self.is_leaf[self.roots]
+        totals = np.full(n_samples, self.value[self.roots[root_leaves]].sum(dtype=np.float64))
+
+        def next_node(rows, trees, nodes):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            return self.roots[trees] + np.where(go_left, self.left[nodes], self.right[nodes])
+
+        # Walkers that reached a leaf add its value and stop
+        for rows, _, children in walk(n_samples, self.roots, self.is_leaf, next_node):
+            at_leaf = self.is_leaf[children]
+            totals += np.bincount(rows[at_leaf], weights=self.value[children[at_leaf]],
+                                  minlength=n_samples)
+
+        return totals / self.n_trees
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+def compare(model, X):
+    """Size, predict time and price deviation of each compact mode vs model"""
+    buffer = io.BytesIO()
+    pickle.dump(model, buffer)
+    original_size = buffer.tell()
+
+    single = X.iloc[:1]
+    reference = model.predict(X)
+    rows = [{
+        'mode': 'original (pickle)',
+        'size_mb': original_size / 1e6,
+        'batch_ms': best_time(lambda: model.predict(X)) * 1000,
+        'single_ms': best_time(lambda: model.predict(single)) * 1000,
+        'max_abs_dev_rm': 0.0
+    }]
+
+    for mode in ('float32', 'binned'):
+        compact = CompactForest.from_model(model, mode)
+        deviation = np.abs(compact.predict(X) - reference).max()
+        rows.append({
+            'mode': mode,
+            'size_mb': compact.nbytes / 1e6,
+            'batch_ms': best_time(lambda: compact.predict(X)) * 1000,
+            'single_ms': best_time(lambda: compact.predict(single)) * 1000,
+            'max_abs_dev_rm': deviation
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+    import pandas as pd
+    from dataset import load_used_cars
+    from pricing import encode_listings, model_features
+
+    parser = argparse.ArgumentParser(description="Export a compact forest and report the savings")
+    parser.add_argument('--model', default=RF_MODEL)
+    parser.add_argument('--output', default=COMPACT_MODEL)
+    parser.add_argument('--mode', choices=['float32', 'binned'], default='float32')
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as file:
+        model = pickle.load(file)
+    X = encode_listings(load_used_cars(USED_CAR))[model_features(model)]
+
+    report = pd.DataFrame(compare(model, X)).set_index('mode')
+    print(report.round(3).to_string())
+
+    CompactForest.from_model(model, args.mode).save(args.output)
+    print(f"\nSaved {args.mode} compact forest to {args.output} "
+          f"({os.path.getsize(args.output) / 1e6:.2f} MB on disk)")
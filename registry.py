@@ -0,0 +1,236 @@
+# registry.py
+import os
+import json
+import pickle
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from datetime import datetime, timezone
+from collections import namedtuple
+
+import pandas as pd
+
+import metrics
+from drift import load_reference, reference_path
+from pricing import FEATURES, model_features
+
+PARENT_PATH = os.getcwd()
+MODELS = os.path.join(PARENT_PATH, 'models')
+RF_MODEL = os.path.join(MODELS, 'RF_regression.pkl')
+REGISTRY = os.path.join(MODELS, 'registry')
+
+MODEL_FILE = 'model.pkl'
+METADATA_FILE = 'metadata.json'
+DRIFT_FILE = 'drift_reference.json'
+CURRENT_FILE = 'CURRENT'
+
+# Version name used when serving the unversioned RF_regression.pkl
+LEGACY_VERSION = 'legacy'
+
+logger = logging.getLogger(__name__)
+
+# Everything served for one version; swapped as a unit on reload
+ServingModel = namedtuple('ServingModel', ['version', 'model', 'metadata', 'drift_reference'])
+
+
+# ============================================================================
+# PUBLISHING
+# ============================================================================
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a file, used to record which data a model was trained on"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def list_versions(registry_dir=REGISTRY):
+    """Published versions, oldest first"""
+    if not os.path.isdir(registry_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(registry_dir)
+        if name.startswith('v') and os.path.isfile(os.path.join(registry_dir, name, METADATA_FILE))
+    )
+
+
+def current_version(registry_dir=REGISTRY):
+    """The version named in the CURRENT pointer, or None"""
+    try:
+        with open(os.path.join(registry_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def activate(version, registry_dir=REGISTRY):
+    """Point CURRENT at a published version (atomic rename)"""
+    if not os.path.isdir(os.path.join(registry_dir, version)):
+        raise ValueError(f"Unknown model version: {version}")
+    tmp_path = os.path.join(registry_dir, f'.{CURRENT_FILE}.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(registry_dir, CURRENT_FILE))
+
+
+def publish(model, registry_dir=REGISTRY, data_path=None, scores=None,
+            features=FEATURES, drift_reference=None, make_current=True):
+    """
+    Store a model as the next version with its metadata and, when given,
+    the training drift reference.
+
+    The version directory is written under a temporary name and renamed
+    into place, so watchers never see a half-written artifact. Returns the
+    new version name.
+    """
+    os.makedirs(registry_dir, exist_ok=True)
+    versions = list_versions(registry_dir)
+    number = int(versions[-1][1:]) + 1 if versions else 1
+    version = f'v{number:04d}'
+
+    metadata = {
+        'version': version,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'model_class': type(model).__name__,
+        'features': list(features),
+        'metrics': {key: float(value) for key, value in (scores or {}).items()},
+        'training_data': os.path.basename(data_path) if data_path else None,
+        'training_data_sha256': file_hash(data_path) if data_path else None
+    }
+
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=registry_dir)
+    try:
+        with open(os.path.join(staging, MODEL_FILE), 'wb') as f:
+            pickle.dump(model, f)
+        with open(os.path.join(staging, METADATA_FILE), 'w') as f:
+            json.dump(metadata, f, indent=2)
+        if drift_reference is not None:
+            with open(os.path.join(staging, DRIFT_FILE), 'w') as f:
+                json.dump(drift_reference, f, indent=2)
+        os.rename(staging, os.path.join(registry_dir, version))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if make_current:
+        activate(version, registry_dir)
+    return version
+
+
+# ============================================================================
+# SERVING
+# ============================================================================
+def _load_reference_if_exists(path):
+    return load_reference(path) if os.path.exists(path) else None
+
+
+def load_version(version, registry_dir=REGISTRY):
+    """Load a published model with its metadata and drift reference"""
+    path = os.path.join(registry_dir, version)
+    with open(os.path.join(path, METADATA_FILE)) as f:
+        metadata = json.load(f)
+    with open(os.path.join(path, MODEL_FILE), 'rb') as f:
+        model = pickle.load(f)
+    return ServingModel(version, model, metadata, _load_reference_if_exists(os.path.join(path, DRIFT_FILE)))
+
+
+def load_legacy(model_path=RF_MODEL):
+    """The unversioned model file, with the drift reference saved beside it"""
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    return ServingModel(LEGACY_VERSION, model, {'version': LEGACY_VERSION},
+                        _load_reference_if_exists(reference_path(model_path)))
+
+
+def warm_up(serving):
+    """Run one prediction so the first real request does not pay for it"""
+    features = model_features(serving.model)
+    serving.model.predict(pd.DataFrame([[0] * len(features)], columns=features))
+
+
+class ModelRegistry:
+    """
+    Serves the model named by the registry's CURRENT pointer.
+
+    A background watcher polls the pointer; when it changes, the new
+    version is loaded and warmed up off the request path and then swapped
+    in with a single attribute assignment, so requests always see either
+    the old or the new model and its artifacts, never a mix. Without any
+    published version, the legacy RF_regression.pkl is served.
+    """
+
+    def __init__(self, registry_dir=REGISTRY, fallback_path=RF_MODEL):
+        self.registry_dir = registry_dir
+        self.fallback_path = fallback_path
+        self._watcher = None
+        self._failed = None
+        self._stop = threading.Event()
+        self.current = self._load(current_version(registry_dir))
+
+    def _load(self, version):
+        with metrics.span('load_model'):
+            if version is None:
+                serving = load_legacy(self.fallback_path)
+            else:
+                serving = load_version(version, self.registry_dir)
+            warm_up(serving)
+        return serving
+
+    def refresh(self):
+        """Swap in the CURRENT version if it changed; returns True on swap"""
+        version = current_version(self.registry_dir)
+        if version is None or version in (self.current.version, self._failed):
+            return False
+        try:
+            serving = self._load(version)
+        except Exception:
+            # Remember the bad version so the watcher does not retry it every poll
+            self._failed = version
+            logger.exception("Failed to load model version %s; keeping %s",
+                             version, self.current.version)
+            return False
+        previous, self.current = self.current, serving
+        metrics.inc('model_reloads', version=version)
+        logger.info("Model version %s replaced %s", version, previous.version)
+        return True
+
+    def start_watcher(self, interval=5.0):
+        """Poll for new versions in a daemon thread (idempotent)"""
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            self.refresh()
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or switch model versions")
+    parser.add_argument('--registry', default=REGISTRY)
+    parser.add_argument('--activate', metavar='VERSION', help="Make VERSION the served model")
+    args = parser.parse_args()
+
+    if args.activate:
+        activate(args.activate, args.registry)
+
+    current = current_version(args.registry)
+    for version in list_versions(args.registry):
+        with open(os.path.join(args.registry, version, METADATA_FILE)) as f:
+            metadata = json.load(f)
+        marker = '*' if version == current else ' '
+        test_r2 = metadata['metrics'].get('test_r2')
+        r2 = f"R² {test_r2:.3f}" if test_r2 is not None else ''
+        print(f"{marker} {version}  {metadata['created_at']}  {r2}")
@@ -0,0 +1,131 @@
+# serve.py
+import os
+import json
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+from pricing import predict_batch
+from registry import REGISTRY, RF_MODEL, ModelRegistry
+from validation import validate_cars
+
+HOST = os.environ.get('CARPRICE_HOST', '127.0.0.1')
+PORT = int(os.environ.get('CARPRICE_PORT', '8600'))
+
+# Largest number of cars accepted in one request
+MAX_BATCH = 1000
+
+CAR_FIELDS = ['year', 'battery_kwh', 'mileage', 'retail_price', 'make', 'turbo', 'transmission']
+RESULT_FIELDS = ['predicted_price', 'depreciation_amount', 'depreciation_percent', 'retention_rate']
+
+
+# ============================================================================
+# JSON PREDICTION API
+# ============================================================================
+class PredictHandler(BaseHTTPRequestHandler):
+    """
+    POST /predict  {"cars": [{year, battery_kwh, mileage, retail_price,
+                              make, turbo, transmission}, ...]}
+    GET  /health   serving model version
+    GET  /metrics  Prometheus text (when CARPRICE_METRICS=1)
+
+    All cars in a request are priced with one batched predict call. A
+    request with any car failing validation is rejected with a 400 that
+    lists each bad car's index and broken rules.
+    """
+
+    registry = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok', 'model_version': self.registry.current.version})
+        elif self.path == '/metrics':
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self._send_json(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length))
+            cars = payload['cars'] if isinstance(payload, dict) and 'cars' in payload else [payload]
+            if not cars or len(cars) > MAX_BATCH:
+                raise ValueError(f"Send between 1 and {MAX_BATCH} cars per request")
+            for car in cars:
+                missing = [field for field in CAR_FIELDS if field not in car]
+                if missing:
+                    raise ValueError(f"Missing fields: {missing}")
+            errors = validate_cars(cars)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            metrics.inc('api_errors', kind='bad_request')
+            self._send_json(400, {'error': str(e)})
+            return
+
+        bad = errors.any(axis=1)
+        if bad.any():
+            metrics.inc('api_errors', int(bad.sum()), kind='invalid_car')
+            self._send_json(400, {
+                'error': f"{int(bad.sum())} of {len(cars)} cars failed validation",
+                'invalid': [
+                    {'index': int(i), 'errors': list(row.index[row])}
+                    for i, row in errors[bad].iterrows()
+                ]
+            })
+            return
+
+        serving = self.registry.current
+        try:
+            with metrics.span('api_predict'):
+                results = predict_batch(serving.model, cars, version=serving.version)
+        except Exception as e:
+            metrics.inc('api_errors', kind='predict')
+            self._send_json(500, {'error': str(e)})
+            return
+
+        self._send_json(200, {
+            'model_version': serving.version,
+            'predictions': results[RESULT_FIELDS].to_dict(orient='records')
+        })
+
+    def log_message(self, *args):
+        pass
+
+
+def make_server(host=HOST, port=PORT, registry_dir=REGISTRY, model_path=RF_MODEL):
+    registry = ModelRegistry(registry_dir, fallback_path=model_path)
+    registry.start_watcher()
+    handler = type('BoundPredictHandler', (PredictHandler,), {'registry': registry})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve price predictions over HTTP")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--registry', default=REGISTRY)
+    parser.add_argument('--model', default=RF_MODEL, help="Fallback when the registry is empty")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.registry, args.model)
+    print(f"Serving predictions on http://{args.host}:{args.port}/predict "
+          f"(model {server.RequestHandlerClass.registry.current.version})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,12 @@
+# timing.py
+import time
+
+
+def best_time(func, repeat=5):
+    """Fastest wall time of `repeat` calls to func, in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
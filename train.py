@@ -0,0 +1,223 @@
+# train.py
+import os
+import pickle
+import argparse
+import numpy as np
+
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+import metrics
+import profiling
+from dataset import load_used_cars
+from dedup import find_duplicates, duplicate_report, drop_duplicates
+from drift import build_reference, reference_path, save_reference
+from feature_selection import N_REPEATS, MIN_IMPORTANCE_PCT, select_by_importance, print_importance
+from pricing import FEATURES, encode_listings
+from registry import REGISTRY, publish
+
+# Define paths
+PARENT_PATH = os.getcwd()
+USED_CAR = os.path.join(PARENT_PATH, 'malaysia_used_cars.csv')
+
+MODELS = os.path.join(PARENT_PATH, 'models')
+RF_MODEL = os.path.join(MODELS, 'RF_regression.pkl')
+
+TARGET = 'current_price(RM)'
+
+
+# ============================================================================
+# PIPELINE STEPS (mirrors Data_process.ipynb)
+# ============================================================================
+@metrics.timed('train_load_data')
+def load_data(path=USED_CAR, cache=True):
+    """Step 1: Data Loading"""
+    return load_used_cars(path, cache=cache)
+
+
+@metrics.timed('train_deduplicate')
+def deduplicate(df):
+    """Drop relisted cars so the forest does not memorize them twice"""
+    clusters = find_duplicates(df)
+    report = duplicate_report(df, clusters)
+    if len(report):
+        n_extra = int((clusters >= 0).sum()) - len(report)
+        print(f"Found {len(report):,} duplicate clusters; dropping {n_extra:,} listings")
+        print(report.head(10).to_string())
+    return drop_duplicates(df, clusters)
+
+
+@metrics.timed('train_clean_data')
+def clean_data(df):
+    """Step 3: Data Cleaning - encode listings the same way the app does"""
+    X = encode_listings(df)
+    y = df[TARGET]
+    return X, y
+
+
+@metrics.timed('train_select_features')
+def select_features(X, features=FEATURES):
+    """Step 4: Features selection"""
+    return X[list(features)]
+
+
+@metrics.timed('train_importance')
+def rank_features(X_train, y_train, n_repeats=N_REPEATS, drop_column=False,
+                  n_jobs=None, min_pct=MIN_IMPORTANCE_PCT):
+    """Prune features by permutation importance on a split of the training set"""
+    features, report = select_by_importance(X_train, y_train, n_repeats=n_repeats,
+                                            drop_column=drop_column, n_jobs=n_jobs, min_pct=min_pct)
+    print_importance(report)
+    print(f"\nSelected {len(features)} of {len(X_train.columns)} features: {features}")
+    return features, report
+
+
+@metrics.timed('train_split')
+def split_data(X, y, test_size=0.3, random_state=42):
+    return train_test_split(X, y, test_size=test_size, random_state=random_state)
+
+
+@metrics.timed('train_fit')
+def train_model(X_train, y_train, random_state=42):
+    """Step 5: Training"""
+    model = RandomForestRegressor(random_state=random_state)
+    model.fit(X_train, y_train)
+    return model
+
+
+@metrics.timed('train_evaluate')
+def evaluate_model(model, X_train, X_test, y_train, y_test):
+    """Compute the same performance metrics as the notebook"""
+    train_pred = model.predict(X_train)
+    final_pred = model.predict(X_test)
+
+    return {
+        'train_mae': mean_absolute_error(y_train, train_pred),
+        'train_rmse': np.sqrt(mean_squared_error(y_train, train_pred)),
+        'train_r2': r2_score(y_train, train_pred),
+        'test_mae': mean_absolute_error(y_test, final_pred),
+        'test_rmse': np.sqrt(mean_squared_error(y_test, final_pred)),
+        'test_r2': r2_score(y_test, final_pred),
+        'mape': np.mean(np.abs((y_test - final_pred) / y_test)) * 100
+    }
+
+
+@metrics.timed('train_save_model')
+def save_model(model, path=RF_MODEL):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        pickle.dump(model, f)
+
+
+@metrics.timed('train_save_drift_reference')
+def save_drift_reference(reference, model_path=RF_MODEL):
+    """Store training feature distributions beside the saved model file"""
+    save_reference(reference, reference_path(model_path))
+
+
+def print_report(scores):
+    print("\n" + "="*70)
+    print("MODEL PERFORMANCE METRICS")
+    print("="*70)
+
+    print("\nTRAINING SET:")
+    print(f"  MAE:  {scores['train_mae']:.2f}")
+    print(f"  RMSE: {scores['train_rmse']:.2f}")
+    print(f"  R²:   {scores['train_r2']:.3f}")
+
+    print("\nTEST SET:")
+    print(f"  MAE:  {scores['test_mae']:.2f}")
+    print(f"  RMSE: {scores['test_rmse']:.2f}")
+    print(f"  R²:   {scores['test_r2']:.3f}")
+    print(f"  MAPE: {scores['mape']:.2f}%")
+
+    print("\nOVERFITTING CHECK:")
+    print(f"R² Difference: {scores['train_r2'] - scores['test_r2']:.3f}")
+    if (scores['train_r2'] - scores['test_r2']) > 0.1:
+        print("Possible overfitting detected!")
+    else:
+        print("Model generalizes well")
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the used car price model")
+    parser.add_argument('--data', default=USED_CAR, help="Path to the listings CSV")
+    parser.add_argument('--output', default=RF_MODEL, help="Where to save the trained model")
+    parser.add_argument('--keep-duplicates', action='store_true',
+                        help="Skip near-duplicate listing removal")
+    parser.add_argument('--registry', default=REGISTRY,
+                        help="Model registry to publish the new version to")
+    parser.add_argument('--no-publish', action='store_true',
+                        help="Only save --output; do not publish a registry version")
+    parser.add_argument('--metrics-file', default=metrics.METRICS_FILE,
+                        help="Write stage timings here in Prometheus text format "
+                             "(requires CARPRICE_METRICS=1)")
+    parser.add_argument('--profile', choices=profiling.MODES, default=profiling.PROFILE_MODE or None,
+                        help="Profile the run with cProfile or the stack sampler")
+    parser.add_argument('--profile-dir', default=profiling.PROFILE_DIR,
+                        help="Directory for profiler output")
+    parser.add_argument('--profile-memory', action='store_true', default=profiling.PROFILE_MEMORY,
+                        help="Also track memory allocations with tracemalloc")
+    parser.add_argument('--select-features', action='store_true',
+                        help="Prune features by permutation importance before the final fit")
+    parser.add_argument('--drop-column', action='store_true',
+                        help="With --select-features, also report drop-column importance")
+    parser.add_argument('--importance-repeats', type=int, default=N_REPEATS,
+                        help="Shuffles per feature for permutation importance")
+    parser.add_argument('--min-importance-pct', type=float, default=MIN_IMPORTANCE_PCT,
+                        help="Keep features that raise validation MAE by more than this %% when shuffled")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="Worker processes for feature selection (default: all CPUs)")
+    parser.add_argument('--importance-report',
+                        help="With --select-features, write the feature importance report as CSV")
+    args = parser.parse_args(argv)
+    if (args.importance_report or args.drop_column) and not args.select_features:
+        parser.error("--importance-report and --drop-column require --select-features")
+
+    with profiling.profiled('train', args.profile or '', args.profile_dir, args.profile_memory):
+        return run(args)
+
+
+def run(args):
+    with metrics.span('train_total'):
+        df = load_data(args.data)
+        if not args.keep_duplicates:
+            df = deduplicate(df)
+        X, y = clean_data(df)
+        X = select_features(X)
+        X_train, X_test, y_train, y_test = split_data(X, y)
+        # Drift is monitored on every encoded input, so the reference keeps all features
+        drift_reference = build_reference(X_train)
+        if args.select_features:
+            features, report = rank_features(
+                X_train, y_train, args.importance_repeats, args.drop_column,
+                args.jobs, args.min_importance_pct
+            )
+            if args.importance_report:
+                report.to_csv(args.importance_report)
+            X_train, X_test = X_train[features], X_test[features]
+        model = train_model(X_train, y_train)
+        scores = evaluate_model(model, X_train, X_test, y_train, y_test)
+        save_model(model, args.output)
+        save_drift_reference(drift_reference, args.output)
+
+    print_report(scores)
+    print(f"\nModel saved to {args.output}")
+
+    if not args.no_publish:
+        with metrics.span('train_publish'):
+            version = publish(model, args.registry, data_path=args.data,
+                              scores=scores, features=X_train.columns,
+                              drift_reference=drift_reference)
+        print(f"Published model version {version} to {args.registry}")
+
+    metrics.write_file(args.metrics_file)
+    return model, scores
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# validation.py
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from pricing import BRAND_CODES, TRANSMISSION_CODES, TURBO_CODES, predict_listings
+
+# ============================================================================
+# ACCEPTED RANGES (same bounds as the app's input widgets)
+# ============================================================================
+YEAR_RANGE = (2015, 2024)
+MILEAGE_RANGE = (0, 300000)
+RETAIL_PRICE_RANGE = (30000.0, 800000.0)
+BATTERY_RANGE = (0.0, 120.0)
+
+FUEL_TYPES = ['Petrol', 'Hybrid', 'Diesel', 'Electric']
+
+NUMERIC_RANGES = {
+    'year': YEAR_RANGE,
+    'mileage': MILEAGE_RANGE,
+    'retail_price(RM)': RETAIL_PRICE_RANGE
+}
+
+CATEGORIES = {
+    'make': list(BRAND_CODES),
+    'transmission': list(TRANSMISSION_CODES)
+}
+
+TURBO_VALUES = {True: True, False: False, 'True': True, 'False': False, 1: True, 0: False}
+
+
+# ============================================================================
+# COLUMN CHECKS
+# ============================================================================
+def validate_listings(df):
+    """
+    Check a frame of listings shaped like malaysia_used_cars.csv.
+
+    Every rule is evaluated on whole columns at once and returns a boolean
+    DataFrame with one column per rule, True where the row breaks it. A row
+    is valid when none of its rules are True.
+    """
+    errors = {}
+    missing = pd.Series(True, index=df.index)
+
+    # Numeric columns: present, parseable and inside the accepted range
+    for column, (low, high) in NUMERIC_RANGES.items():
+        if column not in df:
+            errors[f'{column}_invalid'] = missing
+            continue
+        values = pd.to_numeric(df[column], errors='coerce')
+        errors[f'{column}_invalid'] = values.isna()
+        errors[f'{column}_range'] = (values < low) | (values > high)
+
+    # Categorical columns: present and one of the known values
+    for column, allowed in CATEGORIES.items():
+        if column not in df:
+            errors[f'{column}_unknown'] = missing
+            continue
+        errors[f'{column}_unknown'] = ~df[column].isin(allowed)
+
+    # Battery is optional (non-EVs) but must be in range when given
+    raw_battery = df.get('battery_kWh', pd.Series(np.nan, index=df.index))
+    battery = pd.to_numeric(raw_battery, errors='coerce')
+    errors['battery_kWh_invalid'] = raw_battery.notna() & battery.isna()
+    errors['battery_kWh_range'] = (battery < BATTERY_RANGE[0]) | (battery > BATTERY_RANGE[1])
+    has_battery = battery.fillna(0) > 0
+
+    turbo = df.get('is_turbo', pd.Series(np.nan, index=df.index))
+    turbo_known = turbo.isin(list(TURBO_VALUES))
+    errors['is_turbo_invalid'] = turbo.notna() & ~turbo_known
+
+    # EV consistency as produced by Generate_car.py: EVs carry a battery and
+    # no turbo or engine; combustion cars have no battery and a turbo flag
+    if 'fuel_type' in df:
+        fuel_type = df['fuel_type']
+        is_ev = fuel_type == 'Electric'
+        errors['fuel_type_unknown'] = ~fuel_type.isin(FUEL_TYPES)
+        errors['ev_without_battery'] = is_ev & ~has_battery
+        errors['ev_with_turbo'] = is_ev & turbo.notna()
+        errors['ice_with_battery'] = ~is_ev & has_battery
+        errors['ice_without_turbo_flag'] = ~is_ev & fuel_type.isin(FUEL_TYPES) & turbo.isna()
+        if 'engine_cc' in df:
+            errors['ev_with_engine'] = is_ev & df['engine_cc'].notna()
+    else:
+        # Without a fuel type a car can still not be both turbocharged and electric
+        errors['ev_with_turbo'] = has_battery & turbo.map(TURBO_VALUES).eq(True)
+
+    return pd.DataFrame(errors, index=df.index)
+
+
+def validate_cars(cars):
+    """
+    Check car configurations shaped like the app's inputs (year,
+    battery_kwh, mileage, retail_price, make, turbo, transmission) with
+    the same rules as listings. Turbo must be "Yes" or "No" and the
+    battery is required, since the app sends 0 for non-EVs.
+    """
+    cars = pd.DataFrame(list(cars))
+    turbo = cars['turbo']
+    errors = validate_listings(pd.DataFrame({
+        'year': cars['year'],
+        'mileage': cars['mileage'],
+        'retail_price(RM)': cars['retail_price'],
+        'make': cars['make'],
+        'transmission': cars['transmission'],
+        'battery_kWh': cars['battery_kwh'],
+        'is_turbo': turbo.map({'Yes': True, 'No': False})
+    }))
+    errors['is_turbo_invalid'] = ~turbo.isin(list(TURBO_CODES))
+    errors['battery_kWh_invalid'] |= pd.to_numeric(cars['battery_kwh'], errors='coerce').isna()
+    return errors
+
+
+def split_valid(df, errors=None):
+    """
+    Separate valid rows from quarantined ones.
+
+    Returns (valid, quarantined); quarantined keeps the original columns plus
+    an 'errors' column naming every rule the row broke.
+    """
+    if errors is None:
+        errors = validate_listings(df)
+    bad = errors.any(axis=1)
+
+    quarantined = df[bad].copy()
+    # Concatenate the names of the failed rules for each bad row
+    rule_names = pd.Index(errors.columns + ';')
+    quarantined['errors'] = errors[bad].dot(rule_names).str.rstrip(';')
+    return df[~bad], quarantined
+
+
+def error_summary(errors):
+    """Number of rows breaking each rule, most common first"""
+    counts = errors.sum()
+    return counts[counts > 0].sort_values(ascending=False)
+
+
+def score_listings(model, df, version=None):
+    """
+    Validate then price a batch of listings in one predict call.
+
+    Returns (scored, quarantined): bad rows are set aside with their errors
+    instead of failing the batch or being priced from nonsense inputs.
+    """
+    valid, quarantined = split_valid(df)
+    scored = predict_listings(model, valid, version) if len(valid) else valid.copy()
+    return scored, quarantined
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.getcwd(), 'malaysia_used_cars.csv')
+    df = pd.read_csv(path)
+
+    start = time.perf_counter()
+    errors = validate_listings(df)
+    valid, quarantined = split_valid(df, errors)
+    elapsed = time.perf_counter() - start
+
+    print(f"Validated {len(df):,} rows in {elapsed * 1000:.1f} ms")
+    print(f"  Valid:       {len(valid):,}")
+    print(f"  Quarantined: {len(quarantined):,}")
+    summary = error_summary(errors)
+    if len(summary):
+        print("\nRule violations:")
+        print(summary.to_string())
+        quarantine_path = os.path.splitext(path)[0] + '_quarantine.csv'
+        quarantined.to_csv(quarantine_path, index=False)
+        print(f"\nQuarantined rows written to {quarantine_path}")